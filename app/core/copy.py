@@ -0,0 +1,28 @@
+"""
+Загрузка строк в PostgreSQL командой COPY FROM STDIN.
+"""
+
+import csv
+import io
+
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Загружает строки в таблицу одной командой COPY в формате CSV и
+    возвращает их число. None загружается как NULL, пустая строка —
+    как пустая строка.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    if not count:
+        return 0
+    buffer.seek(0)
+    cursor.copy_expert(
+        f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+        buffer,
+    )
+    return count
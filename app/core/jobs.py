@@ -0,0 +1,346 @@
+"""
+Фоновые задачи в очереди на Postgres.
+
+Задача объявляется декоратором task и ставится в очередь через
+enqueue: запись Job создается в текущей транзакции, поэтому задача
+появляется в очереди только вместе с данными, которые ее породили.
+Воркеры (команда run_worker) забирают задачи через
+SELECT ... FOR UPDATE SKIP LOCKED и арендуют их на время выполнения:
+если воркер упал, задачу после окончания аренды заберет другой.
+Поэтому задачи должны быть идемпотентными.
+"""
+
+import functools
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import DatabaseError, InterfaceError, connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = 'default'
+DEFAULT_MAX_ATTEMPTS = 5
+# Секунды до повтора после первой ошибки, дальше задержка удваивается.
+RETRY_BASE_DELAY = 10
+RETRY_MAX_DELAY = 3600
+LEASE_TIMEOUT = 300
+# Секунды ожидания после ошибки БД в воркере, дальше пауза удваивается.
+ERROR_BASE_DELAY = 1
+ERROR_MAX_DELAY = 60
+
+# clock_timestamp(), а не now(): now() в транзакции не меняется.
+CLAIM_SQL = """
+UPDATE core_job
+SET status = 'running',
+    attempts = attempts + 1,
+    worker = %(worker)s,
+    run_at = clock_timestamp() + %(lease)s * interval '1 second'
+WHERE id = (
+    SELECT id
+    FROM core_job
+    WHERE status IN ('queued', 'running')
+        AND run_at <= clock_timestamp()
+        {queue_filter}
+    ORDER BY run_at, id
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING *
+"""
+
+_tasks = {}
+
+
+class Task:
+    """Функция, зарегистрированная как фоновая задача."""
+
+    def __init__(self, func, name, queue, max_attempts):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, **payload):
+        """Ставит задачу в очередь с аргументами payload."""
+        return enqueue(self, payload)
+
+
+def task(name=None, queue=DEFAULT_QUEUE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Декоратор фоновой задачи. По умолчанию имя задачи — путь к функции,
+    по нему воркер импортирует модуль с задачей.
+    """
+
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        _tasks[task_name] = Task(func, task_name, queue, max_attempts)
+        return _tasks[task_name]
+
+    return decorator
+
+
+def get_task(name):
+    """Возвращает задачу по имени, импортируя ее модуль при необходимости."""
+    if name not in _tasks:
+        try:
+            import_string(name)
+        except ImportError:
+            pass
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise LookupError(f'Неизвестная задача {name}.')
+
+
+def enqueue(task, payload=None, queue=None, delay=0, max_attempts=None):
+    """
+    Ставит задачу в очередь. Аргументы payload передаются в задачу как
+    именованные и должны сериализоваться в JSON.
+    """
+    if isinstance(task, str):
+        task = get_task(task)
+    return Job.objects.create(
+        queue=queue or task.queue,
+        task=task.name,
+        payload=payload or {},
+        max_attempts=max_attempts or task.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def retry_delay(attempts):
+    """Задержка перед повтором: экспоненциальная, со случайным разбросом."""
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1)
+
+
+def claim(worker, queues=None, lease=LEASE_TIMEOUT):
+    """
+    Забирает задачу, готовую к выполнению, и арендует ее на lease
+    секунд. Возвращает None, если таких задач нет.
+    """
+    queue_filter = 'AND queue = ANY(%(queues)s)' if queues else ''
+    jobs = list(
+        Job.objects.raw(
+            CLAIM_SQL.format(queue_filter=queue_filter),
+            {'worker': worker, 'lease': lease, 'queues': list(queues or [])},
+        )
+    )
+    return jobs[0] if jobs else None
+
+
+def _empty_counts():
+    return {'done': 0, 'retried': 0, 'failed': 0, 'time': 0.0}
+
+
+class QueueMetrics:
+    """Счетчики выполненных задач и времени выполнения по очередям."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(_empty_counts)
+        self._started = time.monotonic()
+
+    def record(self, queue, outcome, duration):
+        """Учитывает выполнение задачи с исходом done, retried или failed."""
+        with self._lock:
+            counts = self._counts[queue]
+            counts[outcome] += 1
+            counts['time'] += duration
+
+    def report(self):
+        """
+        Возвращает строки отчета по очередям за период с прошлого отчета
+        и обнуляет счетчики.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(_empty_counts)
+            now = time.monotonic()
+            elapsed, self._started = now - self._started, now
+        lines = []
+        for queue, item in sorted(counts.items()):
+            total = item['done'] + item['retried'] + item['failed']
+            rate = item['done'] / elapsed if elapsed else 0
+            average = item['time'] / total * 1000 if total else 0
+            lines.append(
+                f'{queue}: выполнено {item["done"]} ({rate:.1f} в секунду), '
+                f'повторов {item["retried"]}, ошибок {item["failed"]}, '
+                f'среднее время {average:.0f} мс'
+            )
+        return lines
+
+
+class Worker:
+    """
+    Воркер очереди: concurrency потоков забирают и выполняют задачи.
+    При burst воркер завершается, когда задач не осталось. Каждые
+    report_interval секунд строки отчета QueueMetrics передаются в
+    on_report.
+    """
+
+    def __init__(
+        self,
+        queues=None,
+        concurrency=1,
+        lease=LEASE_TIMEOUT,
+        poll_interval=1.0,
+        burst=False,
+        report_interval=60,
+        on_report=None,
+    ):
+        self.queues = queues
+        self.concurrency = concurrency
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.report_interval = report_interval
+        self.on_report = on_report
+        self.metrics = QueueMetrics()
+        self.stopping = threading.Event()
+        self._report_lock = threading.Lock()
+        self._next_report = time.monotonic() + report_interval
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+
+    def stop(self):
+        """Просит потоки завершиться после текущих задач."""
+        self.stopping.set()
+
+    def run(self):
+        """Запускает потоки и ждет их завершения."""
+        if self.concurrency == 1:
+            self._loop(self.name)
+            return
+        threads = [
+            threading.Thread(
+                target=self._thread, args=(f'{self.name}:{number}',)
+            )
+            for number in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _thread(self, name):
+        try:
+            self._loop(name)
+        finally:
+            connection.close()
+
+    def _loop(self, name):
+        errors = 0
+        while not self.stopping.is_set():
+            self._check_connection()
+            self._maybe_report()
+            try:
+                job = claim(name, self.queues, self.lease)
+                if job is not None:
+                    self.execute(job)
+            except (DatabaseError, InterfaceError):
+                # Поток не завершается: после паузы соединение
+                # проверяется и задача забирается заново.
+                errors += 1
+                logger.exception('Ошибка БД в воркере %s', name)
+                self.stopping.wait(
+                    min(ERROR_BASE_DELAY * 2 ** (errors - 1), ERROR_MAX_DELAY)
+                )
+                continue
+            errors = 0
+            if job is None:
+                if self.burst:
+                    return
+                self.stopping.wait(self.poll_interval)
+
+    def _check_connection(self):
+        """
+        Закрывает соединение, если после ошибки БД оно стало непригодным.
+        Рабочее соединение сохраняется между задачами независимо от
+        CONN_MAX_AGE, внутри транзакции (в тестах) оно не проверяется.
+        """
+        if (
+            connection.connection is None
+            or connection.in_atomic_block
+            or not connection.errors_occurred
+        ):
+            return
+        if connection.is_usable():
+            connection.errors_occurred = False
+        else:
+            connection.close()
+
+    def _maybe_report(self):
+        """Передает отчет в on_report, если подошло его время."""
+        if self.on_report is None:
+            return
+        with self._report_lock:
+            if time.monotonic() < self._next_report:
+                return
+            self._next_report = time.monotonic() + self.report_interval
+        self.on_report(self.metrics.report())
+
+    def execute(self, job):
+        """Выполняет задачу и сохраняет результат."""
+        start = time.perf_counter()
+        if job.attempts > job.max_attempts:
+            outcome = self._fail(
+                job, 'Аренда последней попытки истекла.', retry=False
+            )
+        else:
+            try:
+                func = get_task(job.task)
+            except LookupError as error:
+                outcome = self._fail(job, str(error), retry=False)
+            else:
+                try:
+                    func(**job.payload)
+                except Exception:
+                    logger.exception('Ошибка задачи %s #%s', job, job.pk)
+                    outcome = self._fail(
+                        job,
+                        traceback.format_exc(),
+                        retry=job.attempts < job.max_attempts,
+                    )
+                else:
+                    self._owned(job).delete()
+                    outcome = 'done'
+        self.metrics.record(job.queue, outcome, time.perf_counter() - start)
+
+    def _owned(self, job):
+        """Задача, если ее аренда еще принадлежит этому воркеру."""
+        return Job.objects.filter(
+            pk=job.pk, worker=job.worker, attempts=job.attempts
+        )
+
+    def _fail(self, job, error, retry):
+        """
+        Возвращает задачу в очередь с задержкой или отмечает ее
+        ошибочной.
+        """
+        if retry:
+            self._owned(job).update(
+                status=Job.QUEUED,
+                run_at=timezone.now()
+                + timedelta(seconds=retry_delay(job.attempts)),
+                worker='',
+                last_error=error,
+            )
+            return 'retried'
+        self._owned(job).update(
+            status=Job.FAILED, worker='', last_error=error
+        )
+        return 'failed'
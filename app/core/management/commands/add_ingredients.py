@@ -1,25 +1,74 @@
-import csv
+"""
+Django команда для загрузки каталога ингредиентов из CSV.
+"""
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db import IntegrityError
+from django.db import connection, transaction
 
-from core.models import Ingredient
+from recipe import ingredient_index
+
+CREATE_STAGING_SQL = """
+CREATE TEMP TABLE import_ingredient (
+    seq bigserial PRIMARY KEY,
+    name text,
+    measurement_unit text
+);
+"""
+
+COPY_SQL = """
+COPY import_ingredient (name, measurement_unit) FROM STDIN WITH (FORMAT csv)
+"""
+
+# Из повторяющихся без учета регистра строк файла берется первая,
+# строки, которые уже есть в каталоге, пропускаются.
+UPSERT_SQL = """
+INSERT INTO core_ingredient (name, measurement_unit)
+SELECT DISTINCT ON (lower(name), lower(measurement_unit))
+    name, measurement_unit
+FROM (
+    SELECT seq, btrim(name) AS name,
+        btrim(measurement_unit) AS measurement_unit
+    FROM import_ingredient
+) rows
+WHERE name <> '' AND measurement_unit <> ''
+    AND length(name) <= 255 AND length(measurement_unit) <= 255
+ORDER BY lower(name), lower(measurement_unit), seq
+ON CONFLICT (lower(name), lower(measurement_unit)) DO NOTHING;
+"""
 
 
 class Command(BaseCommand):
+    """Команда для загрузки ингредиентов."""
+
+    help = (
+        'Загружает ингредиенты из CSV (название, единица измерения) '
+        'через COPY. Повторный запуск не создает дубликатов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=settings.BASE_DIR / 'data/ingredients.csv',
+            help='Путь к CSV, по умолчанию data/ingredients.csv.',
+        )
+
     def handle(self, *args, **options):
-        file_path = settings.BASE_DIR / 'data/ingredients.csv'
-        with open(file_path, 'r', encoding='utf-8') as f:
-            try:
-                Ingredient.objects.bulk_create(
-                    Ingredient(name=row[0], measurement_unit=row[1])
-                    for row in csv.reader(f)
-                )
-                self.stdout.write(
-                    self.style.SUCCESS('Ингредиенты успешно добавлены!')
-                )
-            except IntegrityError:
-                self.stdout.write(
-                    self.style.ERROR('Ингредиенты уже существуют в базе!')
-                )
+        with open(options['path'], encoding='utf-8', newline='') as f:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(CREATE_STAGING_SQL)
+                cursor.copy_expert(COPY_SQL, f)
+                cursor.execute('SELECT count(*) FROM import_ingredient')
+                total = cursor.fetchone()[0]
+                cursor.execute(UPSERT_SQL)
+                inserted = cursor.rowcount
+                cursor.execute('DROP TABLE import_ingredient')
+                ingredient_index.invalidate()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Добавлено ингредиентов: {inserted}, '
+                f'пропущено: {total - inserted}.'
+            )
+        )
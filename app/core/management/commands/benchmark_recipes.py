@@ -0,0 +1,152 @@
+"""
+Django команда для замера скорости сериализации списка рецептов.
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Ingredient, Recipe, RecipeIngredient, Tag
+from core.renderers import ORJSONRenderer
+from recipe import fastpath
+from recipe.serializers import RecipeSerializer
+
+TAGS_PER_RECIPE = 2
+INGREDIENTS_PER_RECIPE = 5
+
+
+class Rollback(Exception):
+    """Откат тестовых данных после замера."""
+
+
+class Command(BaseCommand):
+    """Команда для сравнения способов вывода списка рецептов."""
+
+    help = (
+        'Сравнивает RecipeSerializer и быстрое чтение списка рецептов, '
+        'а также JSONRenderer и ORJSONRenderer.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='Количество рецептов для замера.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Количество повторов, берется лучший результат.',
+        )
+
+    def _create_recipes(self, count):
+        """Создает рецепты с тегами и ингредиентами."""
+        user = get_user_model().objects.create_user(
+            username='benchmark', password=None
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'Тег {i}') for i in range(10)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {i}') for i in range(50)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                user=user,
+                title=f'Рецепт {i}',
+                description='Описание рецепта',
+                cooking_time=30,
+            )
+            for i in range(count)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(
+                recipe_id=recipe.id,
+                tag_id=tags[(i + j) % len(tags)].id,
+            )
+            for i, recipe in enumerate(recipes)
+            for j in range(TAGS_PER_RECIPE)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredients[(i + j) % len(ingredients)],
+                amount=j + 1,
+            )
+            for i, recipe in enumerate(recipes)
+            for j in range(INGREDIENTS_PER_RECIPE)
+        )
+
+    def _best_time(self, func, repeat):
+        """Возвращает лучшее время выполнения функции и ее результат."""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def _serializer(self):
+        """Список рецептов через RecipeSerializer."""
+        queryset = Recipe.objects.order_by('-id').prefetch_related(
+            'tags', 'recipeingredient_set__ingredient'
+        )
+        return RecipeSerializer(queryset, many=True).data
+
+    def _fastpath(self):
+        """Список рецептов через быстрое чтение."""
+        fields = [
+            name
+            for name, field in RecipeSerializer().fields.items()
+            if not field.write_only
+        ]
+        rows = list(
+            Recipe.objects.order_by('-id').values(*fastpath.RECIPE_COLUMNS)
+        )
+        return fastpath.build_recipe_rows(rows, fields)
+
+    def benchmark(self, count, repeat):
+        """Выполняет замеры для заданного числа рецептов."""
+        self._create_recipes(count)
+        results = {}
+        for name, func in (
+            ('serializer', self._serializer),
+            ('fastpath', self._fastpath),
+        ):
+            results[name] = self._best_time(func, repeat)
+
+        data = results['fastpath'][1]
+        for name, renderer in (
+            ('json', JSONRenderer()),
+            ('orjson', ORJSONRenderer()),
+        ):
+            results[name] = self._best_time(
+                lambda: renderer.render(data), repeat
+            )
+        return results
+
+    def handle(self, *args, **options):
+        for count in options['rows']:
+            try:
+                with transaction.atomic():
+                    results = self.benchmark(count, options['repeat'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+            self.stdout.write(self.style.WARNING(f'\nРецептов: {count}'))
+            for group in (('serializer', 'fastpath'), ('json', 'orjson')):
+                baseline = results[group[0]][0]
+                for name in group:
+                    elapsed = results[name][0]
+                    self.stdout.write(
+                        f'{name:<12} {elapsed * 1000:10.1f} мс '
+                        f'x{baseline / elapsed:.1f}'
+                    )
@@ -0,0 +1,55 @@
+"""
+Django команда для удаления изображений, на которые нет ссылок.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import ImageFile, Recipe
+from recipe import images
+
+
+class Command(BaseCommand):
+    """Команда для удаления изображений без ссылок."""
+
+    help = (
+        'Удаляет файлы изображений и их копии, на которые не ссылается ни '
+        'один рецепт дольше заданного времени.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=3600,
+            help=(
+                'Сколько секунд файл без ссылок хранится до удаления, '
+                'по умолчанию 3600.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['grace'] < 0:
+            raise CommandError('Время хранения не может быть меньше 0.')
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        storage = Recipe._meta.get_field('image').storage
+
+        # Файлы удаляются под блокировкой записей: загрузка того же файла
+        # дождется удаления и запишет его заново.
+        with transaction.atomic():
+            names = list(
+                ImageFile.objects.select_for_update(skip_locked=True)
+                .filter(ref_count=0, updated_at__lt=cutoff)
+                .values_list('name', flat=True)
+            )
+            for name in names:
+                storage.delete(name)
+                images.delete_renditions(name)
+            ImageFile.objects.filter(name__in=names).delete()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Удалено изображений: {len(names)}.')
+        )
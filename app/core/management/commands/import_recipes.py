@@ -0,0 +1,348 @@
+"""
+Django команда для потокового импорта рецептов из JSONL или CSV.
+"""
+
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.copy import copy_rows
+from recipe import ingredient_index, pantry
+from recipe.cache import invalidate_recipes
+from recipe.export import split_escaped
+
+MAX_LENGTH = 255
+MAX_SMALLINT = 32767
+
+CREATE_STAGING_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS import_recipe (
+    seq bigint PRIMARY KEY,
+    recipe_id bigint,
+    title varchar(255) NOT NULL,
+    description text NOT NULL,
+    cooking_time integer NOT NULL,
+    link varchar(255) NOT NULL
+);
+CREATE TEMP TABLE IF NOT EXISTS import_recipe_tag (
+    seq bigint NOT NULL,
+    name varchar(255) NOT NULL
+);
+CREATE TEMP TABLE IF NOT EXISTS import_recipe_ingredient (
+    seq bigint NOT NULL,
+    name varchar(255) NOT NULL,
+    measurement_unit varchar(255) NOT NULL,
+    amount integer NOT NULL
+);
+"""
+
+TRUNCATE_STAGING_SQL = """
+TRUNCATE import_recipe, import_recipe_tag, import_recipe_ingredient;
+"""
+
+DROP_STAGING_SQL = """
+DROP TABLE IF EXISTS import_recipe, import_recipe_tag,
+    import_recipe_ingredient;
+"""
+
+# Переносит пачку из промежуточных таблиц. id рецептов выделяются из
+# последовательности заранее, чтобы связать с ними теги и ингредиенты.
+# Для повторяющихся названий берется тег с меньшим id, как при создании
+# рецепта через API. Ингредиенты сопоставляются без учета регистра.
+MERGE_SQL = """
+UPDATE import_recipe
+SET recipe_id = nextval(pg_get_serial_sequence('core_recipe', 'id'));
+
+INSERT INTO core_tag (name)
+SELECT DISTINCT s.name
+FROM import_recipe_tag s
+WHERE NOT EXISTS (SELECT 1 FROM core_tag t WHERE t.name = s.name);
+
+INSERT INTO core_ingredient (name, measurement_unit)
+SELECT DISTINCT ON (lower(name), lower(measurement_unit))
+    name, measurement_unit
+FROM import_recipe_ingredient
+ORDER BY lower(name), lower(measurement_unit), seq
+ON CONFLICT (lower(name), lower(measurement_unit)) DO NOTHING;
+
+INSERT INTO core_recipe (
+    id, user_id, title, description, cooking_time, link, image,
+    image_renditions, updated_at
+)
+SELECT recipe_id, %(user_id)s, title, description, cooking_time, link,
+    '', '{}', now()
+FROM import_recipe
+ORDER BY seq;
+
+INSERT INTO core_recipe_tags (recipe_id, tag_id)
+SELECT r.recipe_id, t.id
+FROM import_recipe_tag s
+JOIN import_recipe r ON r.seq = s.seq
+JOIN (
+    SELECT name, min(id) AS id FROM core_tag GROUP BY name
+) t ON t.name = s.name;
+
+INSERT INTO core_recipeingredient (recipe_id, ingredient_id, amount)
+SELECT r.recipe_id, i.id, s.amount
+FROM import_recipe_ingredient s
+JOIN import_recipe r ON r.seq = s.seq
+JOIN core_ingredient i
+    ON lower(i.name) = lower(s.name)
+    AND lower(i.measurement_unit) = lower(s.measurement_unit);
+"""
+
+
+def clean_text(value, field, required=False, max_length=MAX_LENGTH):
+    """Проверяет строковое поле записи."""
+    if value is None:
+        value = ''
+    if not isinstance(value, str):
+        raise ValueError(f'{field}: ожидается строка.')
+    value = value.strip()
+    if required and not value:
+        raise ValueError(f'{field}: обязательное поле.')
+    if max_length is not None and len(value) > max_length:
+        raise ValueError(f'{field}: не более {max_length} символов.')
+    return value
+
+
+def clean_int(value, field, min_value):
+    """Проверяет целочисленное поле записи."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field}: ожидается целое число.')
+    if not min_value <= value <= MAX_SMALLINT:
+        raise ValueError(f'{field}: число от {min_value} до {MAX_SMALLINT}.')
+    return value
+
+
+def clean_record(data):
+    """
+    Проверяет запись рецепта и возвращает кортеж
+    (поля рецепта, названия тегов, ингредиенты).
+    """
+    if not isinstance(data, dict):
+        raise ValueError('ожидается объект рецепта.')
+    recipe = (
+        clean_text(data.get('title'), 'title', required=True),
+        clean_text(data.get('description'), 'description', max_length=None),
+        clean_int(data.get('cooking_time'), 'cooking_time', 0),
+        clean_text(data.get('link'), 'link'),
+    )
+
+    tags = []
+    for tag in data.get('tags') or []:
+        if isinstance(tag, dict):
+            tag = tag.get('name')
+        name = clean_text(tag, 'tags', required=True)
+        if name not in tags:
+            tags.append(name)
+
+    ingredients = []
+    keys = set()
+    for ingredient in data.get('ingredients') or []:
+        if not isinstance(ingredient, dict):
+            raise ValueError('ingredients: ожидается объект ингредиента.')
+        key = (
+            clean_text(ingredient.get('name'), 'ingredients', required=True),
+            clean_text(
+                ingredient.get('measurement_unit'),
+                'ingredients',
+                required=True,
+            ),
+        )
+        normalized = ingredient_index.normalize_key(key)
+        if normalized in keys:
+            raise ValueError(
+                'ingredients: ингредиенты в рецепте не должны повторяться.'
+            )
+        keys.add(normalized)
+        ingredients.append(
+            key + (clean_int(ingredient.get('amount'), 'ingredients', 1),)
+        )
+    return recipe, tags, ingredients
+
+
+def read_jsonl(stream):
+    """Генерирует записи рецептов из строк JSON."""
+    for line in stream:
+        if not line.strip():
+            yield None
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            yield ValueError(f'некорректный JSON: {error}')
+
+
+def read_csv(stream):
+    """
+    Генерирует записи рецептов из CSV с колонками title, description,
+    cooking_time, link, tags, ingredients. Теги разделяются «;»,
+    ингредиенты записываются как «название|единица|количество» через «;».
+    Разделители в названиях экранируются обратной косой чертой.
+    """
+    for row in csv.DictReader(stream):
+        ingredients = []
+        for item in split_escaped(
+            row.get('ingredients') or '', ';', unescape=False
+        ):
+            if not item.strip():
+                continue
+            parts = split_escaped(item, '|')
+            if len(parts) != 3:
+                yield ValueError(
+                    'ingredients: ожидается «название|единица|количество».'
+                )
+                break
+            name, unit, amount = parts
+            ingredients.append(
+                {'name': name, 'measurement_unit': unit, 'amount': amount}
+            )
+        else:
+            row['tags'] = [
+                tag for tag in split_escaped(row.get('tags') or '', ';') if tag
+            ]
+            row['ingredients'] = ingredients
+            yield row
+
+
+class Command(BaseCommand):
+    """Команда для импорта рецептов."""
+
+    help = (
+        'Импортирует рецепты из JSONL или CSV пачками через COPY во '
+        'временные таблицы и перенос в таблицы рецептов, тегов и '
+        'ингредиентов.'
+    )
+    readers = {'jsonl': read_jsonl, 'csv': read_csv}
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Путь к файлу или «-» для чтения из stdin.'
+        )
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Юзернейм автора импортируемых рецептов.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(self.readers),
+            help='Формат файла, по умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Количество рецептов в одной пачке.',
+        )
+
+    def _records(self, records):
+        """
+        Проверяет записи и генерирует кортежи (номер, рецепт, теги,
+        ингредиенты). Ошибочные записи выводятся и пропускаются.
+        """
+        for number, record in enumerate(records, start=1):
+            if record is None:
+                continue
+            try:
+                if isinstance(record, ValueError):
+                    raise record
+                yield (number, *clean_record(record))
+            except ValueError as error:
+                self.skipped += 1
+                self.stderr.write(f'Запись {number}: {error}')
+
+    def _import_chunk(self, cursor, chunk, user_id):
+        """Загружает пачку рецептов через промежуточные таблицы."""
+        with transaction.atomic():
+            cursor.execute(TRUNCATE_STAGING_SQL)
+            copy_rows(
+                cursor,
+                'import_recipe',
+                ('seq', 'title', 'description', 'cooking_time', 'link'),
+                ((seq, *recipe) for seq, recipe, _, _ in chunk),
+            )
+            copy_rows(
+                cursor,
+                'import_recipe_tag',
+                ('seq', 'name'),
+                ((seq, name) for seq, _, tags, _ in chunk for name in tags),
+            )
+            copy_rows(
+                cursor,
+                'import_recipe_ingredient',
+                ('seq', 'name', 'measurement_unit', 'amount'),
+                (
+                    (seq, *ingredient)
+                    for seq, _, _, ingredients in chunk
+                    for ingredient in ingredients
+                ),
+            )
+            cursor.execute(MERGE_SQL, {'user_id': user_id})
+            invalidate_recipes([])
+            ingredient_index.invalidate()
+            pantry.invalidate()
+
+    def _import(self, stream, reader, user_id, chunk_size):
+        records = self._records(reader(stream))
+        start = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_STAGING_SQL)
+            try:
+                while True:
+                    chunk = list(islice(records, chunk_size))
+                    if not chunk:
+                        break
+                    self._import_chunk(cursor, chunk, user_id)
+                    self.imported += len(chunk)
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f'Импортировано рецептов: {self.imported} '
+                        f'({self.imported / elapsed:.0f} в секунду)'
+                    )
+            finally:
+                cursor.execute(DROP_STAGING_SQL)
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('Размер пачки должен быть больше 0.')
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Юзер {options["user"]} не найден.')
+
+        path = options['path']
+        file_format = options['format']
+        if file_format is None:
+            file_format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+        reader = self.readers[file_format]
+
+        self.imported = 0
+        self.skipped = 0
+        if path == '-':
+            elapsed = self._import(
+                sys.stdin, reader, user.pk, options['chunk_size']
+            )
+        else:
+            with open(path, encoding='utf-8', newline='') as stream:
+                elapsed = self._import(
+                    stream, reader, user.pk, options['chunk_size']
+                )
+
+        rate = self.imported / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Импорт завершен: рецептов {self.imported}, '
+                f'пропущено {self.skipped} за {elapsed:.1f} с '
+                f'({rate:.0f} в секунду).'
+            )
+        )
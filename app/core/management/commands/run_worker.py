@@ -0,0 +1,99 @@
+"""
+Django команда для запуска воркера фоновых задач.
+"""
+
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    """Команда для запуска воркера очереди."""
+
+    help = (
+        'Выполняет фоновые задачи из очереди в БД. Задачи забираются '
+        'через SELECT ... FOR UPDATE SKIP LOCKED, поэтому можно запускать '
+        'несколько воркеров одновременно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue',
+            action='append',
+            dest='queues',
+            help='Очередь для обработки, можно указать несколько раз. '
+            'По умолчанию обрабатываются все очереди.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Количество потоков, выполняющих задачи.',
+        )
+        parser.add_argument(
+            '--lease',
+            type=int,
+            default=jobs.LEASE_TIMEOUT,
+            help='Секунды, через которые задачу упавшего воркера заберет '
+            'другой.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Секунды ожидания, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--report-interval',
+            type=float,
+            default=60,
+            help='Секунды между отчетами о пропускной способности.',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Завершиться, когда задач в очереди не останется.',
+        )
+
+    def report(self, lines):
+        """Выводит строки отчета о пропускной способности очередей."""
+        for line in lines:
+            self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('Количество потоков должно быть больше 0.')
+        if options['lease'] < 1:
+            raise CommandError('Время аренды должно быть больше 0.')
+
+        worker = jobs.Worker(
+            queues=options['queues'],
+            concurrency=options['concurrency'],
+            lease=options['lease'],
+            poll_interval=options['poll_interval'],
+            burst=options['burst'],
+            report_interval=options['report_interval'],
+            on_report=self.report,
+        )
+        # По SIGINT и SIGTERM потоки дорабатывают текущие задачи.
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                handlers[signum] = signal.signal(
+                    signum, lambda *args: worker.stop()
+                )
+
+        self.stdout.write(
+            f'Воркер {worker.name} запущен, потоков: '
+            f'{options["concurrency"]}.'
+        )
+        try:
+            worker.run()
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.report(worker.metrics.report())
+        self.stdout.write(self.style.SUCCESS('Воркер остановлен.'))
@@ -0,0 +1,41 @@
+# Generated by Django 3.2 on 2026-10-18 14:00
+
+from django.db import migrations
+
+CREATE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS ingredient_name_trgm_idx
+ON core_ingredient USING gin (name gin_trgm_ops);
+"""
+
+DROP_INDEX_SQL = 'DROP INDEX IF EXISTS ingredient_name_trgm_idx;'
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Создает расширение pg_trgm и триграммный индекс по названию
+    ингредиента. Если расширение не установлено на сервере, индекс
+    не создается, и подсказки работают через ILIKE.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+    schema_editor.execute(CREATE_INDEX_SQL)
+
+
+def drop_trigram_index(apps, schema_editor):
+    schema_editor.execute(DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
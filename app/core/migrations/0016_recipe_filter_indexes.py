@@ -0,0 +1,35 @@
+# Generated by Django 3.2 on 2026-10-18 17:27
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+# Индекс для выборки рецептов по тегу без обращения к таблице.
+CREATE_TAGS_INDEX_SQL = """
+CREATE INDEX recipe_tags_tag_recipe_idx
+ON core_recipe_tags (tag_id, recipe_id);
+"""
+
+DROP_TAGS_INDEX_SQL = 'DROP INDEX IF EXISTS recipe_tags_tag_recipe_idx;'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_ingredient_name_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='ingredient_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeingredient',
+            index=models.Index(fields=['ingredient', 'recipe'], name='recipeingredient_ingr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='tag_name_lower_idx'),
+        ),
+        migrations.RunSQL(CREATE_TAGS_INDEX_SQL, DROP_TAGS_INDEX_SQL),
+    ]
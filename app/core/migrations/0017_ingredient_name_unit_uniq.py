@@ -0,0 +1,70 @@
+# Generated by Django 3.2 on 2026-10-18 17:35
+
+from django.db import migrations
+
+# Объединяет ингредиенты, которые отличаются только регистром, с
+# ингредиентом с меньшим id. Связи с рецептами переносятся, а если
+# рецепт уже связан с оставшимся ингредиентом, лишняя связь удаляется.
+MERGE_DUPLICATES_SQL = """
+CREATE TEMP TABLE ingredient_duplicate AS
+SELECT id, keep_id
+FROM (
+    SELECT id, min(id) OVER (
+        PARTITION BY lower(name), lower(measurement_unit)
+    ) AS keep_id
+    FROM core_ingredient
+) ingredients
+WHERE id <> keep_id;
+
+DELETE FROM core_recipeingredient
+WHERE id IN (
+    SELECT id
+    FROM (
+        SELECT ri.id, row_number() OVER (
+            PARTITION BY ri.recipe_id, coalesce(d.keep_id, ri.ingredient_id)
+            ORDER BY d.id IS NOT NULL, ri.id
+        ) AS position
+        FROM core_recipeingredient ri
+        LEFT JOIN ingredient_duplicate d ON d.id = ri.ingredient_id
+    ) links
+    WHERE position > 1
+);
+
+UPDATE core_recipeingredient ri
+SET ingredient_id = d.keep_id
+FROM ingredient_duplicate d
+WHERE ri.ingredient_id = d.id;
+
+DELETE FROM core_ingredient i
+USING ingredient_duplicate d
+WHERE i.id = d.id;
+
+DROP TABLE ingredient_duplicate;
+
+-- Проверяет отложенные внешние ключи до создания индекса.
+SET CONSTRAINTS ALL IMMEDIATE;
+SET CONSTRAINTS ALL DEFERRED;
+"""
+
+CREATE_INDEX_SQL = """
+CREATE UNIQUE INDEX ingredient_name_unit_uniq
+ON core_ingredient (lower(name), lower(measurement_unit));
+"""
+
+DROP_INDEX_SQL = 'DROP INDEX IF EXISTS ingredient_name_unit_uniq;'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='ingredient_name_lower_idx',
+        ),
+        migrations.RunSQL(MERGE_DUPLICATES_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(CREATE_INDEX_SQL, DROP_INDEX_SQL),
+    ]
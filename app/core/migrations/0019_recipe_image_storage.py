@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-18 17:49
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+# Заводит счетчики ссылок для уже загруженных изображений.
+BACKFILL_SQL = """
+INSERT INTO core_imagefile (name, ref_count, updated_at)
+SELECT image, count(*), now()
+FROM core_recipe
+WHERE image IS NOT NULL AND image <> ''
+GROUP BY image;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Путь')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Изменен')),
+            ],
+            options={
+                'verbose_name': 'Файл изображения',
+                'verbose_name_plural': 'Файлы изображений',
+            },
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path, verbose_name='Изображение'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -3,7 +3,6 @@
 """
 
 import os
-import uuid
 
 from django.conf import settings
 from django.contrib.auth.models import (
@@ -11,15 +10,24 @@ from django.contrib.auth.models import (
     BaseUserManager,
     PermissionsMixin,
 )
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from core.signals import recipe_ingredients_deleted
+from core.storage import ContentAddressedStorage
 
 
 def recipe_image_file_path(instanse, filename):
-    """Генерация пути для изображения рецепта."""
+    """
+    Генерация пути для изображения рецепта. Имя файла заменяется хэшем
+    содержимого в ContentAddressedStorage.
+    """
     ext = os.path.splitext(filename)[1]
-    filename = f'{uuid.uuid4()}{ext}'
-    return os.path.join('uploads', 'recipe', filename)
+    return os.path.join('uploads', 'recipe', f'image{ext}')
 
 
 class UserManager(BaseUserManager):
@@ -54,6 +62,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255, verbose_name='имя')
     is_active = models.BooleanField(default=True, verbose_name='активен')
     is_staff = models.BooleanField(default=False, verbose_name='персонал')
+    token_version = models.PositiveIntegerField(
+        default=0, verbose_name='версия ключа токенов'
+    )
     USERNAME_FIELD = 'username'
     objects = UserManager()
 
@@ -81,12 +92,28 @@ class Recipe(models.Model):
         'Ingredient', through='RecipeIngredient', verbose_name='Ингредиент'
     )
     image = models.ImageField(
-        null=True, upload_to=recipe_image_file_path, verbose_name='Изображение'
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=ContentAddressedStorage(),
+        verbose_name='Изображение',
     )
+    # Пути уменьшенных копий изображения, заполняются recipe.images.
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Копии изображения',
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменен')
+    # Заполняется триггером БД из title и description (миграция 0014).
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -100,6 +127,9 @@ class Tag(models.Model):
     class Meta:
         verbose_name = 'Тег'
         verbose_name_plural = 'Теги'
+        indexes = [
+            models.Index(Lower('name'), name='tag_name_lower_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -116,11 +146,33 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        # Уникальность пары (lower(name), lower(measurement_unit))
+        # обеспечивает индекс ingredient_name_unit_uniq (миграция 0017).
 
     def __str__(self):
         return self.name
 
 
+class RecipeIngredientQuerySet(models.QuerySet):
+    """Выборка связей рецептов с ингредиентами."""
+
+    def delete(self):
+        """
+        Удаляет связи и отправляет recipe_ingredients_deleted с id
+        затронутых рецептов.
+        """
+        recipe_ids = set(self.values_list('recipe_id', flat=True))
+        result = super().delete()
+        if recipe_ids:
+            recipe_ingredients_deleted.send(
+                sender=self.model, recipe_ids=recipe_ids
+            )
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class RecipeIngredient(models.Model):
     """Промежуточная модель для связи рецептов и ингредиентов с количеством."""
 
@@ -134,14 +186,143 @@ class RecipeIngredient(models.Model):
         'Количество',
         validators=[MinValueValidator(1, 'Количество должно быть больше 0')],
     )
+    objects = RecipeIngredientQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецептах'
         unique_together = ('recipe', 'ingredient')
+        indexes = [
+            models.Index(
+                fields=['ingredient', 'recipe'],
+                name='recipeingredient_ingr_idx',
+            ),
+        ]
 
     def __str__(self):
         return (
             f'{self.ingredient.name} - {self.amount} '
             f'{self.ingredient.measurement_unit}'
         )
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        recipe_ingredients_deleted.send(
+            sender=type(self), recipe_ids={self.recipe_id}
+        )
+        return result
+
+
+class ImageFileManager(models.Manager):
+    """Менеджер для счетчиков ссылок на файлы изображений."""
+
+    def adjust(self, name, delta):
+        """
+        Изменяет число ссылок на файл на delta и обновляет время
+        изменения, создавая запись при необходимости. Запрос выполняется
+        в БД менеджера, см. db_manager().
+        """
+        if not name:
+            return
+        table = self.model._meta.db_table
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (name, ref_count, updated_at)
+                VALUES (%(name)s, GREATEST(%(delta)s, 0), now())
+                ON CONFLICT (name) DO UPDATE SET
+                    ref_count = GREATEST({table}.ref_count + %(delta)s, 0),
+                    updated_at = now()
+                """,
+                {'name': name, 'delta': delta},
+            )
+
+    def touch(self, name):
+        """Отмечает использование файла, не меняя число ссылок."""
+        self.adjust(name, 0)
+
+    def acquire(self, name):
+        """Добавляет ссылку на файл."""
+        self.adjust(name, 1)
+
+    def release(self, name):
+        """Удаляет ссылку на файл."""
+        self.adjust(name, -1)
+
+
+class ImageFile(models.Model):
+    """Файл изображения в хранилище и число ссылок на него."""
+
+    name = models.CharField(max_length=255, unique=True, verbose_name='Путь')
+    ref_count = models.PositiveIntegerField(
+        default=0, verbose_name='Число ссылок'
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменен')
+    objects = ImageFileManager()
+
+    class Meta:
+        verbose_name = 'Файл изображения'
+        verbose_name_plural = 'Файлы изображений'
+
+    def __str__(self):
+        return self.name
+
+
+class Job(models.Model):
+    """
+    Фоновая задача в очереди. Выполненные задачи удаляются, задачи,
+    исчерпавшие попытки, остаются со статусом failed.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    queue = models.CharField(
+        max_length=64, default='default', verbose_name='Очередь'
+    )
+    task = models.CharField(max_length=255, verbose_name='Задача')
+    payload = models.JSONField(default=dict, verbose_name='Аргументы')
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name='Статус',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попытки'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=5, verbose_name='Максимум попыток'
+    )
+    # Время, с которого задачу можно взять: для задач в очереди —
+    # время запуска, для выполняемых — окончание аренды воркером.
+    run_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Время запуска'
+    )
+    worker = models.CharField(
+        max_length=255, blank=True, verbose_name='Воркер'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Создана'
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(
+                fields=['queue', 'run_at'],
+                name='job_queue_run_at_idx',
+                condition=models.Q(status__in=['queued', 'running']),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} ({self.queue})'
@@ -0,0 +1,105 @@
+"""
+Пагинатор с приблизительным подсчетом строк.
+"""
+
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+
+class EstimatedPage(Page):
+    """
+    Страница пагинатора с оценкой числа строк: наличие следующей
+    страницы определяется по строкам выборки, а не по оценке.
+    """
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def end_index(self):
+        return self.start_index() + len(self) - 1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор, который для больших нефильтрованных таблиц берет число
+    строк из статистики PostgreSQL (pg_class.reltuples) вместо COUNT(*).
+
+    Для небольших таблиц, отфильтрованных выборок и других СУБД
+    выполняется точный подсчет. Оценка используется только для count и
+    num_pages: страница выбирается с одной лишней строкой, по которой
+    определяется наличие следующей, поэтому строки за пределами оценки
+    остаются доступны.
+    """
+
+    estimate_threshold = 10000
+
+    def _estimate_count(self):
+        """Возвращает оценку числа строк таблицы или None."""
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
+
+    @cached_property
+    def estimated_count(self):
+        """Возвращает оценку числа строк, если она используется, или None."""
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = self._estimate_count()
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        return None
+
+    @cached_property
+    def count(self):
+        """Возвращает общее число объектов."""
+        if self.estimated_count is not None:
+            return self.estimated_count
+        return super().count
+
+    def validate_number(self, number):
+        """
+        При оценке числа строк номер страницы не сравнивается с
+        num_pages: пустые страницы отсекает page().
+        """
+        if self.estimated_count is None:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        """Возвращает страницу, выбирая на одну строку больше."""
+        if self.estimated_count is None:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        return EstimatedPage(
+            object_list[:self.per_page],
+            number,
+            self,
+            has_next=len(object_list) > self.per_page,
+        )
@@ -0,0 +1,70 @@
+"""
+Рендереры API на основе orjson.
+"""
+
+import decimal
+import math
+import re
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+# Число в экспоненциальной записи в выводе orjson: orjson пишет 1e-7 и
+# 1e16, а json — 1e-07 и 1e+16. Совпадение внутри строки только
+# включает стандартный рендерер, вывод от этого не меняется.
+EXPONENT_NUMBER = re.compile(rb'[:,\[]-?\d+(?:\.\d+)?e[-+]?\d+(?=[,\]}])')
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson, совместимый по выводу с JSONRenderer.
+
+    Типы, которые orjson не поддерживает (Decimal, ленивые строки
+    перевода и т.д.), а также datetime, date и time передаются в
+    encoder_class, поэтому их представление совпадает с DRF. Если
+    запрошен отступ, ASCII-вывод или некомпактный формат, а также если
+    в выводе есть числа в экспоненциальной записи (float или Decimal),
+    используется стандартный JSONRenderer. Он же используется для
+    данных, которые orjson вывести не может (например, целые больше
+    64 бит). В отличие от JSONRenderer, NaN и Infinity во float
+    выводятся как null, а не вызывают ошибку.
+    """
+
+    options = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+    def default(self, obj):
+        """Приводит объект к поддерживаемому orjson типу."""
+        if isinstance(obj, decimal.Decimal):
+            value = float(obj)
+            if not math.isfinite(value) or 'e' in repr(value):
+                raise TypeError('Decimal требует стандартного рендерера.')
+            return value
+        return self.encoder_class().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Выводит data в JSON, возвращает строку байт."""
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.default, option=self.options
+            )
+        except orjson.JSONEncodeError:
+            # Ошибку или точное представление даст стандартный рендерер.
+            return super().render(data, accepted_media_type, renderer_context)
+        if EXPONENT_NUMBER.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Как и JSONRenderer, экранируем символы U+2028 и U+2029.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
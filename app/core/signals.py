@@ -0,0 +1,11 @@
+"""
+Сигналы моделей core.
+"""
+
+from django.dispatch import Signal
+
+# Отправляется один раз на удаление связей рецептов с ингредиентами
+# через QuerySet.delete() или RecipeIngredient.delete() с аргументом
+# recipe_ids. В отличие от post_delete, обработчики этого сигнала не
+# отключают быстрое каскадное удаление связей вместе с рецептом.
+recipe_ingredients_deleted = Signal()
@@ -0,0 +1,78 @@
+"""
+Хранилище файлов с адресацией по содержимому.
+
+Имя файла выводится из SHA-256 содержимого, поэтому одинаковые файлы
+хранятся один раз, а их URL не меняются и кэшируются навсегда. Число
+ссылок на файл ведется в модели ImageFile, файлы без ссылок удаляет
+команда cleanup_images.
+"""
+
+import hashlib
+import posixpath
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.deconstruct import deconstructible
+
+
+def file_hash(content):
+    """Возвращает SHA-256 содержимого файла, читая его частями."""
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Записывает загружаемый файл во временный файл на диске и вычисляет
+    его хэш по мере получения данных, без повторного чтения.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.hasher.hexdigest()
+        return file
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором имя файла заменяется хэшем его
+    содержимого. Каталог и расширение берутся из переданного имени.
+    """
+
+    def hashed_name(self, name, digest):
+        """Возвращает путь файла с хэшем digest."""
+        directory, filename = posixpath.split(name)
+        ext = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], f'{digest}{ext}')
+
+    def save(self, name, content, max_length=None):
+        """
+        Сохраняет файл под хэшем содержимого. Если такой файл уже есть,
+        запись пропускается.
+        """
+        from core.models import ImageFile
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = getattr(content, 'content_hash', None) or file_hash(content)
+        name = self.hashed_name(name, digest)
+        # Отметка до проверки наличия файла не дает cleanup_images удалить
+        # его между проверкой и сохранением ссылки.
+        ImageFile.objects.touch(name)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
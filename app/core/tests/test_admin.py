@@ -2,6 +2,9 @@
 Тест админ панели.
 """
 
+from unittest.mock import patch
+
+from core.models import Ingredient
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase
 from django.urls import reverse
@@ -32,6 +35,30 @@ class AdminSiteTest(TestCase):
         self.assertContains(res, self.user.name)
         self.assertContains(res, self.user.username)
 
+    @patch(
+        'core.pagination.EstimatedCountPaginator._estimate_count',
+        return_value=50000,
+    )
+    def test_ingredient_list_estimated_count(self, patched_estimate):
+        """Тест — список ингредиентов использует оценку числа строк."""
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        url = reverse('admin:core_ingredient_changelist')
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context['cl'].result_count, 50000)
+        self.assertContains(res, 'Соль')
+
+    def test_ingredient_search_exact_count(self):
+        """Тест — поиск ингредиентов использует точный подсчет."""
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        Ingredient.objects.create(name='Перец', measurement_unit='г')
+        url = reverse('admin:core_ingredient_changelist')
+        res = self.client.get(url, {'q': 'Соль'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context['cl'].result_count, 1)
+
     def test_edit_user_page(self):
         """Тест редактирования страницы юзера."""
         url = reverse('admin:core_user_change', args=[self.user.id])
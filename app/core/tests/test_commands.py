@@ -1,10 +1,21 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
 from psycopg2 import OperationalError as Psycopg2Error
 
+from core.models import ImageFile, Ingredient, Recipe, RecipeIngredient, Tag
+from recipe import images
+from recipe.export import stream_csv
+
 
 @patch('core.management.commands.wait_for_db.Command.check')
 class CommandTest(SimpleTestCase):
@@ -24,3 +35,255 @@ class CommandTest(SimpleTestCase):
         call_command('wait_for_db')
         self.assertEqual(patched_check.call_count, 5)
         patched_check.assert_called_with(databases=['default'])
+
+
+class BenchmarkRecipesCommandTest(TestCase):
+    def test_benchmark_recipes(self):
+        """Тест замера сериализации, данные замера откатываются."""
+        out = StringIO()
+        call_command('benchmark_recipes', rows=[5], repeat=1, stdout=out)
+
+        self.assertIn('serializer', out.getvalue())
+        self.assertIn('fastpath', out.getvalue())
+        self.assertIn('orjson', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+
+class ImportRecipesCommandTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='chef')
+        self.egg = Ingredient.objects.create(
+            name='Яйцо', measurement_unit='шт'
+        )
+
+    def _write(self, suffix, content):
+        """Записывает временный файл импорта и возвращает путь."""
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def _import(self, path, **options):
+        out = StringIO()
+        err = StringIO()
+        call_command(
+            'import_recipes',
+            path,
+            user='chef',
+            stdout=out,
+            stderr=err,
+            **options,
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_import_jsonl(self):
+        """Тест импорта рецептов из JSONL пачками."""
+        records = [
+            {
+                'title': 'Омлет',
+                'cooking_time': 10,
+                'tags': [{'name': 'Завтрак'}, 'Быстро'],
+                'ingredients': [
+                    {'name': 'Яйцо', 'measurement_unit': 'шт', 'amount': 3},
+                    {'name': 'Молоко', 'measurement_unit': 'мл', 'amount': 50},
+                ],
+            },
+            {'title': '', 'cooking_time': 5},
+            {
+                'title': 'Яичница',
+                'description': 'Просто',
+                'cooking_time': 5,
+                'tags': ['Завтрак'],
+                'ingredients': [
+                    {'name': 'Яйцо', 'measurement_unit': 'шт', 'amount': 2}
+                ],
+            },
+        ]
+        path = self._write(
+            '.jsonl', '\n'.join(json.dumps(record) for record in records)
+        )
+
+        out, err = self._import(path, chunk_size=1)
+
+        self.assertIn('рецептов 2, пропущено 1', out)
+        self.assertEqual(out.count('Импортировано рецептов'), 2)
+        self.assertIn('Запись 2: title', err)
+        omelette = Recipe.objects.get(title='Омлет')
+        self.assertEqual(omelette.user, self.user)
+        self.assertEqual(
+            sorted(omelette.tags.values_list('name', flat=True)),
+            ['Быстро', 'Завтрак'],
+        )
+        self.assertEqual(Tag.objects.filter(name='Завтрак').count(), 1)
+        self.assertEqual(Ingredient.objects.filter(name='Яйцо').count(), 1)
+        self.assertEqual(
+            RecipeIngredient.objects.get(
+                recipe__title='Яичница', ingredient=self.egg
+            ).amount,
+            2,
+        )
+        self.assertEqual(
+            Recipe.objects.get(title='Яичница').description, 'Просто'
+        )
+
+    def test_import_csv(self):
+        """Тест импорта рецептов из CSV."""
+        path = self._write(
+            '.csv',
+            'title,description,cooking_time,link,tags,ingredients\n'
+            'Блины,,30,,Завтрак;Выпечка,Яйцо|шт|2;Мука|г|200\n'
+            'Сырники,,20,,Завтрак,Творог|г\n',
+        )
+
+        out, err = self._import(path)
+
+        self.assertIn('рецептов 1, пропущено 1', out)
+        self.assertIn('Запись 2: ingredients', err)
+        recipe = Recipe.objects.get(title='Блины')
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Мука', 'Яйцо'],
+        )
+
+    def test_import_csv_export_round_trip(self):
+        """Тест — разделители в названиях из выгрузки CSV сохраняются."""
+        item = {
+            'id': 1,
+            'title': 'Соус',
+            'description': '',
+            'cooking_time': 5,
+            'link': '',
+            'image': None,
+            'tags': [{'name': 'Соусы; заправки'}, {'name': 'A|B\\'}],
+            'ingredients': [
+                {
+                    'name': 'Соль; крупная',
+                    'measurement_unit': 'г|кг',
+                    'amount': 2,
+                },
+                {'name': 'Перец\\', 'measurement_unit': 'г', 'amount': 1},
+            ],
+        }
+        path = self._write('.csv', ''.join(stream_csv([item])))
+
+        out, err = self._import(path)
+
+        self.assertIn('рецептов 1, пропущено 0', out)
+        recipe = Recipe.objects.get(title='Соус')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['A|B\\', 'Соусы; заправки'],
+        )
+        self.assertEqual(
+            sorted(
+                recipe.recipeingredient_set.values_list(
+                    'ingredient__name',
+                    'ingredient__measurement_unit',
+                    'amount',
+                )
+            ),
+            [('Перец\\', 'г', 1), ('Соль; крупная', 'г|кг', 2)],
+        )
+
+    def test_unknown_user(self):
+        """Тест — импорт для несуществующего юзера завершается ошибкой."""
+        path = self._write('.jsonl', '')
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', path, user='nobody')
+
+
+class AddIngredientsCommandTest(TestCase):
+    def test_add_ingredients_idempotent(self):
+        """Тест — повторная загрузка каталога не создает дубликатов."""
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('соль,г\nМука, г\nмука,Г\nЯйцо,шт\n,г\n')
+        self.addCleanup(os.remove, path)
+
+        out = StringIO()
+        call_command('add_ingredients', path, stdout=out)
+        self.assertIn(
+            'Добавлено ингредиентов: 2, пропущено: 3.', out.getvalue()
+        )
+
+        out = StringIO()
+        call_command('add_ingredients', path, stdout=out)
+        self.assertIn(
+            'Добавлено ингредиентов: 0, пропущено: 5.', out.getvalue()
+        )
+
+        self.assertEqual(
+            sorted(
+                Ingredient.objects.values_list('name', 'measurement_unit')
+            ),
+            [('Мука', 'г'), ('Соль', 'г'), ('Яйцо', 'шт')],
+        )
+
+    def test_add_default_catalogue(self):
+        """Тест загрузки каталога из data/ingredients.csv."""
+        call_command('add_ingredients', stdout=StringIO())
+
+        self.assertTrue(Ingredient.objects.exists())
+
+
+class CleanupImagesCommandTest(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        settings = override_settings(MEDIA_ROOT=tmpdir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user(username='chef')
+
+    def _create_recipe(self, content):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Рецепт', cooking_time=5
+        )
+        recipe.image.save('image.jpg', ContentFile(content))
+        return recipe
+
+    def _cleanup(self, **options):
+        out = StringIO()
+        call_command('cleanup_images', stdout=out, **options)
+        return out.getvalue()
+
+    def test_cleanup_unreferenced_images(self):
+        """Тест удаления изображений, на которые не ссылаются рецепты."""
+        first = self._create_recipe(b'same')
+        second = self._create_recipe(b'same')
+        other = self._create_recipe(b'other')
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(ImageFile.objects.get(name=name).ref_count, 2)
+        rendition = images.rendition_paths(name)['card']['webp']
+        default_storage.save(rendition, ContentFile(b'card'))
+
+        first.delete()
+        self.assertIn('Удалено изображений: 0.', self._cleanup(grace=0))
+        self.assertTrue(first.image.storage.exists(name))
+
+        second.delete()
+        self.assertEqual(ImageFile.objects.get(name=name).ref_count, 0)
+        self.assertIn('Удалено изображений: 0.', self._cleanup())
+        self.assertIn('Удалено изображений: 1.', self._cleanup(grace=0))
+
+        self.assertFalse(first.image.storage.exists(name))
+        self.assertFalse(default_storage.exists(rendition))
+        self.assertFalse(ImageFile.objects.filter(name=name).exists())
+        self.assertTrue(other.image.storage.exists(other.image.name))
+
+    def test_replaced_image_released(self):
+        """Тест, что замена изображения переносит ссылку."""
+        recipe = self._create_recipe(b'old')
+        old_name = recipe.image.name
+        recipe = Recipe.objects.get(pk=recipe.pk)
+
+        recipe.image.save('image.jpg', ContentFile(b'new'))
+
+        self.assertEqual(ImageFile.objects.get(name=old_name).ref_count, 0)
+        self.assertEqual(
+            ImageFile.objects.get(name=recipe.image.name).ref_count, 1
+        )
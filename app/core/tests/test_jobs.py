@@ -0,0 +1,235 @@
+"""
+Тесты очереди фоновых задач.
+"""
+
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+calls = []
+calls_lock = threading.Lock()
+
+
+@jobs.task(queue='test')
+def record(value):
+    with calls_lock:
+        calls.append(value)
+
+
+@jobs.task(queue='test', max_attempts=2)
+def broken():
+    raise ValueError('сломалось')
+
+
+def run_worker(**options):
+    out = StringIO()
+    call_command('run_worker', burst=True, stdout=out, **options)
+    return out.getvalue()
+
+
+class JobQueueTests(TestCase):
+    """Тесты постановки и выполнения задач."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Тест выполнения задачи с аргументами и удаления ее из очереди."""
+        job = record.enqueue(value=1)
+        self.assertEqual(job.queue, 'test')
+        self.assertEqual(job.task, 'core.tests.test_jobs.record')
+        jobs.enqueue('core.tests.test_jobs.record', {'value': 2})
+
+        out = run_worker()
+
+        self.assertEqual(calls, [1, 2])
+        self.assertFalse(Job.objects.exists())
+        self.assertIn('test: выполнено 2', out)
+
+    def test_delayed_job_waits(self):
+        """Тест, что отложенная задача не выполняется раньше времени."""
+        jobs.enqueue(record, {'value': 1}, delay=60)
+
+        run_worker()
+
+        self.assertEqual(calls, [])
+        self.assertEqual(Job.objects.get().status, Job.QUEUED)
+
+    def test_queue_filter(self):
+        """Тест, что воркер берет задачи только из своих очередей."""
+        jobs.enqueue(record, {'value': 1}, queue='other')
+        record.enqueue(value=2)
+
+        run_worker(queues=['test'])
+
+        self.assertEqual(calls, [2])
+        self.assertEqual(Job.objects.get().queue, 'other')
+
+    def test_retry_with_backoff(self):
+        """Тест повтора упавшей задачи с задержкой и итоговой ошибки."""
+        broken.enqueue()
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            out = run_worker()
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('ValueError: сломалось', job.last_error)
+        self.assertIn('повторов 1', out)
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            out = run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('ошибок 1', out)
+
+        run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+
+    def test_retry_delay(self):
+        """Тест экспоненциальной задержки повторов."""
+        with patch('core.jobs.random.uniform', return_value=1):
+            delays = [jobs.retry_delay(attempt) for attempt in (1, 2, 3, 20)]
+        self.assertEqual(
+            delays,
+            [
+                jobs.RETRY_BASE_DELAY,
+                jobs.RETRY_BASE_DELAY * 2,
+                jobs.RETRY_BASE_DELAY * 4,
+                jobs.RETRY_MAX_DELAY,
+            ],
+        )
+
+    def test_unknown_task_fails(self):
+        """Тест, что неизвестная задача сразу отмечается ошибочной."""
+        job = Job.objects.create(task='core.tests.test_jobs.missing')
+
+        run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('Неизвестная задача', job.last_error)
+
+    @patch('core.jobs.ERROR_BASE_DELAY', 0)
+    def test_database_error_does_not_stop_worker(self):
+        """Тест, что после ошибки БД воркер продолжает забирать задачи."""
+        record.enqueue(value=1)
+
+        with patch(
+            'core.jobs.claim',
+            side_effect=[OperationalError('нет соединения'), None],
+        ) as patched_claim:
+            with self.assertLogs('core.jobs', 'ERROR'):
+                run_worker()
+
+        self.assertEqual(patched_claim.call_count, 2)
+        run_worker()
+        self.assertEqual(calls, [1])
+
+    def test_expired_lease_reclaimed(self):
+        """Тест, что задачу упавшего воркера забирает другой."""
+        lost = Job.objects.create(
+            queue='test',
+            task=record.name,
+            payload={'value': 1},
+            status=Job.RUNNING,
+            attempts=1,
+            worker='lost',
+            run_at=timezone.now() - timedelta(seconds=1),
+        )
+        exhausted = Job.objects.create(
+            queue='test',
+            task=record.name,
+            payload={'value': 2},
+            status=Job.RUNNING,
+            attempts=5,
+            max_attempts=5,
+            worker='lost',
+            run_at=timezone.now() - timedelta(seconds=1),
+        )
+        Job.objects.create(
+            queue='test',
+            task=record.name,
+            payload={'value': 3},
+            status=Job.RUNNING,
+            attempts=1,
+            worker='alive',
+            run_at=timezone.now() + timedelta(seconds=60),
+        )
+
+        run_worker()
+
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.filter(pk=lost.pk).exists())
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertEqual(
+            Job.objects.get(worker='alive').status, Job.RUNNING
+        )
+
+
+class JobConcurrencyTests(TransactionTestCase):
+    """Тесты одновременной работы воркеров."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_skip_locked(self):
+        """Тест, что заблокированная задача пропускается другим воркером."""
+        first = record.enqueue(value=1)
+        second = record.enqueue(value=2)
+        claimed = []
+
+        def claim():
+            try:
+                claimed.append(jobs.claim('other'))
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            self.assertEqual(jobs.claim('first').pk, first.pk)
+            thread = threading.Thread(target=claim)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(claimed[0].pk, second.pk)
+
+    def test_connection_kept_between_jobs(self):
+        """Тест, что воркер не переподключается к БД для каждой задачи."""
+        for value in range(3):
+            record.enqueue(value=value)
+        connection.ensure_connection()
+
+        with patch.object(
+            connection, 'connect', wraps=connection.connect
+        ) as connect:
+            run_worker()
+
+        connect.assert_not_called()
+        self.assertEqual(calls, [0, 1, 2])
+
+    def test_concurrent_workers(self):
+        """Тест, что каждая задача выполняется ровно один раз."""
+        for value in range(40):
+            record.enqueue(value=value)
+
+        run_worker(concurrency=4)
+
+        self.assertEqual(sorted(calls), list(range(40)))
+        self.assertFalse(Job.objects.exists())
@@ -2,8 +2,6 @@
 Тест моделей.
 """
 
-from unittest.mock import patch
-
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
@@ -75,10 +73,25 @@ class ModelTests(TestCase):
         )
         self.assertEqual(str(ingredient), ingredient.name)
 
-    @patch('core.models.uuid.uuid4')
-    def test_recipe_file_name_uuid(self, mock_uuid):
+    def test_recipe_file_name(self):
         """Тест генерации пути для изображений."""
-        uuid = 'test-uuid'
-        mock_uuid.return_value = uuid
         file_path = models.recipe_image_file_path(None, 'example-img.jpg')
-        self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
+        self.assertEqual(file_path, 'uploads/recipe/image.jpg')
+
+    def test_image_file_references(self):
+        """Тест счетчика ссылок на файл изображения."""
+        name = 'uploads/recipe/ab/ab.jpg'
+        models.ImageFile.objects.acquire(name)
+        models.ImageFile.objects.acquire(name)
+        models.ImageFile.objects.release(name)
+        self.assertEqual(
+            models.ImageFile.objects.get(name=name).ref_count, 1
+        )
+
+        models.ImageFile.objects.release(name)
+        models.ImageFile.objects.release(name)
+        models.ImageFile.objects.touch('')
+        self.assertEqual(
+            models.ImageFile.objects.get(name=name).ref_count, 0
+        )
+        self.assertEqual(models.ImageFile.objects.count(), 1)
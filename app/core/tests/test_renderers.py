@@ -0,0 +1,117 @@
+"""
+Тесты рендерера и парсера на orjson.
+"""
+
+import datetime
+import decimal
+import io
+import uuid
+from collections import OrderedDict
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Тесты совместимости ORJSONRenderer с JSONRenderer."""
+
+    def assertSameOutput(self, data, accepted_media_type=None):
+        """Проверяет, что оба рендерера дают одинаковый вывод."""
+        expected = JSONRenderer().render(data, accepted_media_type)
+        result = ORJSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(result, expected)
+
+    def test_render_basic_types(self):
+        """Тест вывода строк, чисел, списков и словарей."""
+        self.assertSameOutput(
+            OrderedDict(
+                [
+                    ('id', 1),
+                    ('title', 'Омлет "по-домашнему"'),
+                    ('ratio', 0.5),
+                    ('tags', [{'name': 'Завтрак'}, {'name': 'Ужин'}]),
+                    ('image', None),
+                    ('is_public', True),
+                    ('separators', 'a b c'),
+                    (1, 'int key'),
+                ]
+            )
+        )
+
+    def test_render_decimal(self):
+        """Тест вывода Decimal."""
+        self.assertSameOutput(
+            {
+                'price': decimal.Decimal('12.50'),
+                'tiny': decimal.Decimal('0.0000001'),
+                'huge': decimal.Decimal('1e20'),
+            }
+        )
+
+    def test_render_float_exponent(self):
+        """Тест вывода float в экспоненциальной записи."""
+        self.assertSameOutput({'a': 1e-7, 'b': [1e16, -2.5e-10], 'c': 1.5})
+        self.assertSameOutput({'text': ':1e5]', 'value': 1e300})
+
+    def test_render_datetime(self):
+        """Тест вывода datetime, date и time."""
+        moscow = datetime.timezone(datetime.timedelta(hours=3))
+        self.assertSameOutput(
+            {
+                'utc': datetime.datetime(
+                    2025, 5, 14, 11, 54, 1, 123456, datetime.timezone.utc
+                ),
+                'moscow': datetime.datetime(
+                    2025, 5, 14, 14, 54, tzinfo=moscow
+                ),
+                'naive': datetime.datetime(2025, 5, 14, 11, 54),
+                'date': datetime.date(2025, 5, 14),
+                'time': datetime.time(11, 54, 1),
+                'duration': datetime.timedelta(minutes=30),
+            }
+        )
+
+    def test_render_lazy_string_and_uuid(self):
+        """Тест вывода ленивых строк перевода и UUID."""
+        self.assertSameOutput(
+            {
+                'message': gettext_lazy('Рецепт'),
+                'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+                'ids': {1, 2, 3},
+                'big': 2**70,
+            }
+        )
+
+    def test_render_indent(self):
+        """Тест вывода с отступами."""
+        self.assertSameOutput(
+            {'tags': [{'name': 'Завтрак'}]}, 'application/json; indent=4'
+        )
+
+    def test_render_none(self):
+        """Тест — пустые данные выводятся как пустая строка."""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ORJSONParserTests(SimpleTestCase):
+    """Тесты ORJSONParser."""
+
+    def test_parse(self):
+        """Тест разбора JSON."""
+        content = '{"title": "Омлет", "tags": [{"name": "Завтрак"}]}'
+        stream = io.BytesIO(content.encode('utf-8'))
+        expected = JSONParser().parse(io.BytesIO(content.encode('utf-8')))
+
+        self.assertEqual(ORJSONParser().parse(stream), expected)
+
+    def test_parse_error(self):
+        """Тест — некорректный JSON пробрасывает ParseError."""
+        for content in (b'{"title": ', b'{"value": NaN}'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(content))
@@ -0,0 +1,79 @@
+"""
+Тесты хранилища с адресацией по содержимому.
+"""
+
+import hashlib
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase
+
+from core.models import ImageFile
+from core.storage import ContentAddressedStorage, HashingFileUploadHandler
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Тесты ContentAddressedStorage."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_save_uses_content_hash(self):
+        """Тест, что имя файла выводится из хэша содержимого."""
+        digest = hashlib.sha256(b'content').hexdigest()
+
+        name = self.storage.save('uploads/recipe/a.JPG', ContentFile(b'c'))
+        same = self.storage.save(
+            'uploads/recipe/b.jpg', ContentFile(b'content')
+        )
+
+        self.assertNotEqual(name, same)
+        self.assertEqual(same, f'uploads/recipe/{digest[:2]}/{digest}.jpg')
+        with self.storage.open(same) as f:
+            self.assertEqual(f.read(), b'content')
+        self.assertTrue(ImageFile.objects.filter(name=same).exists())
+
+    def test_save_identical_skips_write(self):
+        """Тест, что одинаковый файл не записывается повторно."""
+        name = self.storage.save('uploads/a.png', ContentFile(b'image'))
+
+        with patch.object(
+            ContentAddressedStorage,
+            '_save',
+            side_effect=AssertionError('файл записан повторно'),
+        ):
+            same = self.storage.save('uploads/b.png', ContentFile(b'image'))
+
+        self.assertEqual(name, same)
+        self.assertEqual(ImageFile.objects.get(name=name).ref_count, 0)
+
+    def test_upload_handler_hash(self):
+        """Тест, что обработчик загрузки вычисляет хэш по частям."""
+        handler = HashingFileUploadHandler()
+        handler.new_file('image', 'a.jpg', 'image/jpeg', 6)
+        handler.receive_data_chunk(b'abc', 0)
+        handler.receive_data_chunk(b'def', 3)
+        file = handler.file_complete(6)
+
+        self.assertEqual(
+            file.content_hash, hashlib.sha256(b'abcdef').hexdigest()
+        )
+        file.seek(0)
+        self.assertEqual(file.read(), b'abcdef')
+        file.close()
+
+
+class ImageFileManagerTests(SimpleTestCase):
+    """Тесты счетчиков ссылок ImageFileManager."""
+
+    def test_adjust_uses_manager_db(self):
+        """Тест, что счетчик меняется в БД менеджера, а не в default."""
+        with patch('core.models.connections') as patched_connections:
+            ImageFile.objects.db_manager('replica').acquire('a.jpg')
+
+        patched_connections.__getitem__.assert_called_once_with('replica')
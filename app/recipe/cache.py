@@ -0,0 +1,113 @@
+"""
+Кэш ответов API рецептов для анонимных пользователей.
+
+Ключ ответа включает версию: общую для списков и отдельную для
+каждого рецепта. Инвалидация удаляет ключ версии, после чего
+следующий запрос получает новую случайную версию, и все старые
+записи становятся недостижимыми.
+"""
+
+import functools
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+LIST_VERSION_KEY = 'recipe:list:version'
+DETAIL_VERSION_KEY = 'recipe:detail:{}:version'
+RESPONSE_KEY = 'recipe:response:{}:{}'
+
+# Заголовки, которые сохраняются вместе с данными ответа.
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+# Фильтры сравниваются без учета регистра.
+CASE_INSENSITIVE_PARAMS = ('tags', 'ingredients')
+
+
+def get_version(key, timeout=None):
+    """
+    Возвращает текущую версию, создавая ее при необходимости. Версия
+    с timeout истекает через timeout секунд.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout)
+        version = cache.get(key)
+    return version
+
+
+def normalize_params(query_params):
+    """Возвращает параметры запроса в каноническом виде."""
+    params = []
+    for name, values in query_params.lists():
+        if name in CASE_INSENSITIVE_PARAMS:
+            values = [value.lower() for value in values]
+        params.extend((name, value) for value in sorted(values))
+    return urlencode(sorted(params))
+
+
+def get_cache_key(request, recipe_id=None):
+    """Возвращает ключ кэша для запроса к списку или рецепту."""
+    if recipe_id is None:
+        version = get_version(LIST_VERSION_KEY)
+    else:
+        version = get_version(DETAIL_VERSION_KEY.format(recipe_id))
+    raw = '{}{}?{}'.format(
+        request.get_host(), request.path, normalize_params(request.GET)
+    )
+    return RESPONSE_KEY.format(
+        version, hashlib.md5(raw.encode('utf-8')).hexdigest()
+    )
+
+
+def invalidate_recipes(recipe_ids):
+    """
+    Сбрасывает кэш списков и указанных рецептов после фиксации
+    транзакции, чтобы не закэшировать данные до коммита.
+    """
+    keys = [LIST_VERSION_KEY]
+    keys.extend(DETAIL_VERSION_KEY.format(pk) for pk in set(recipe_ids))
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def cache_anonymous_response(method):
+    """
+    Кэширует успешные ответы действия вьюсета для анонимных
+    пользователей. Для действий с pk кэш привязан к рецепту.
+    """
+
+    @functools.wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return method(view, request, *args, **kwargs)
+
+        recipe_id = kwargs.get(view.lookup_url_kwarg or view.lookup_field)
+        if recipe_id is not None:
+            if not str(recipe_id).isdigit():
+                return method(view, request, *args, **kwargs)
+            recipe_id = int(recipe_id)
+
+        key = get_cache_key(request, recipe_id)
+        cached = cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            return Response(data, headers=headers)
+
+        response = method(view, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            headers = {
+                name: response[name]
+                for name in CACHED_HEADERS
+                if response.has_header(name)
+            }
+            cache.set(
+                key, (response.data, headers), settings.RECIPE_CACHE_TIMEOUT
+            )
+        return response
+
+    return wrapper
@@ -0,0 +1,74 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для рецептов.
+"""
+
+import functools
+import hashlib
+from calendar import timegm
+
+from core.models import Recipe
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from recipe.cache import normalize_params
+
+
+def get_etag(request, recipe_id, updated_at):
+    """
+    Возвращает строгий ETag рецепта. Он учитывает параметры запроса,
+    хост и формат ответа, так как от них зависит тело ответа.
+    """
+    raw = '{}:{}:{}:{}:{}'.format(
+        recipe_id,
+        updated_at.isoformat(),
+        request.get_host(),
+        request.accepted_renderer.format,
+        normalize_params(request.GET),
+    )
+    return quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+def set_validators(response, request, recipe_id, updated_at):
+    """Добавляет в ответ заголовки ETag и Last-Modified."""
+    response['ETag'] = get_etag(request, recipe_id, updated_at)
+    response['Last-Modified'] = http_date(timegm(updated_at.utctimetuple()))
+    return response
+
+
+def conditional_recipe_response(method):
+    """
+    Для условных запросов проверяет If-None-Match и If-Modified-Since
+    по updated_at рецепта до сериализации и отвечает 304, если рецепт
+    не изменился.
+    """
+
+    @functools.wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        recipe_id = kwargs.get(view.lookup_url_kwarg or view.lookup_field)
+        is_conditional = (
+            'HTTP_IF_NONE_MATCH' in request.META
+            or 'HTTP_IF_MODIFIED_SINCE' in request.META
+        )
+        if not is_conditional or not str(recipe_id).isdigit():
+            return method(view, request, *args, **kwargs)
+
+        updated_at = (
+            Recipe.objects.filter(pk=recipe_id)
+            .values_list('updated_at', flat=True)
+            .first()
+        )
+        if updated_at is None:
+            return method(view, request, *args, **kwargs)
+
+        response = get_conditional_response(
+            request,
+            etag=get_etag(request, recipe_id, updated_at),
+            last_modified=timegm(updated_at.utctimetuple()),
+        )
+        if response is None:
+            return method(view, request, *args, **kwargs)
+        if response.status_code == 304:
+            set_validators(response, request, recipe_id, updated_at)
+        return response
+
+    return wrapper
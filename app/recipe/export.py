@@ -0,0 +1,106 @@
+"""
+Потоковая выгрузка рецептов с тегами и ингредиентами.
+
+Рецепты читаются серверным курсором (iterator), теги и ингредиенты
+подгружаются отдельными запросами на каждую пачку рецептов, поэтому
+память не зависит от размера таблицы. Формат записей совпадает с
+входным форматом команды import_recipes.
+"""
+
+import csv
+import re
+from itertools import islice
+
+import orjson
+
+from recipe import fastpath
+from recipe.shopping import Echo
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = (
+    'id',
+    'title',
+    'description',
+    'cooking_time',
+    'link',
+    'image',
+    'tags',
+    'ingredients_display',
+)
+
+CSV_HEADER = EXPORT_FIELDS[:-1] + ('ingredients',)
+
+# Разделители списков в ячейках CSV. В значениях они и сама обратная
+# косая черта экранируются обратной косой чертой.
+ESCAPED_CHARS = re.compile(r'[\\;|]')
+
+
+def escape(value):
+    """Экранирует разделители списков в значении ячейки CSV."""
+    return ESCAPED_CHARS.sub(lambda match: '\\' + match.group(), str(value))
+
+
+def split_escaped(value, separator, unescape=True):
+    """
+    Разбивает значение ячейки CSV по неэкранированному separator. Без
+    unescape экранирование в частях сохраняется для следующего разбиения.
+    """
+    parts = []
+    current = []
+    chars = iter(value)
+    for char in chars:
+        if char == '\\':
+            escaped = next(chars, '')
+            current.append(escaped if unescape else char + escaped)
+        elif char == separator:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append(''.join(current))
+    return parts
+
+
+def export_recipes(queryset, request=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Генерирует словари рецептов, читая выборку пачками."""
+    rows = queryset.values(*fastpath.RECIPE_COLUMNS, 'link').iterator(
+        chunk_size=chunk_size
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        for item in fastpath.build_recipe_rows(chunk, EXPORT_FIELDS, request):
+            item['ingredients'] = item.pop('ingredients_display')
+            yield item
+
+
+def stream_ndjson(items):
+    """Генерирует строки NDJSON."""
+    for item in items:
+        yield orjson.dumps(item) + b'\n'
+
+
+def stream_csv(items):
+    """
+    Генерирует строки CSV. Теги разделяются «;», ингредиенты
+    записываются как «название|единица|количество» через «;». «;», «|»
+    и «\\» в названиях экранируются обратной косой чертой.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for item in items:
+        yield writer.writerow(
+            [item[field] for field in EXPORT_FIELDS[:-2]]
+            + [
+                ';'.join(escape(tag['name']) for tag in item['tags']),
+                ';'.join(
+                    '|'.join(
+                        escape(ing[field])
+                        for field in ('name', 'measurement_unit', 'amount')
+                    )
+                    for ing in item['ingredients']
+                ),
+            ]
+        )
@@ -1,13 +1,113 @@
-from core.models import Recipe
+from core.models import Recipe, RecipeIngredient
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, Exists, F, FloatField, OuterRef
+from django.db.models.functions import Cast, Lower
 from django_filters import rest_framework as filters
 
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (
+    (MATCH_ANY, 'Любое из значений'),
+    (MATCH_ALL, 'Все значения'),
+)
+
+
+def split_names(value):
+    """Разбирает значения через запятую в множество имен без регистра."""
+    return {name.strip().lower() for name in value.split(',') if name.strip()}
+
 
 class RecipeFilter(filters.FilterSet):
-    tags = filters.CharFilter(field_name='tags__name', lookup_expr='iexact')
-    ingredients = filters.CharFilter(
-        field_name='ingredients__name', lookup_expr='iexact'
+    """
+    Фильтры рецептов.
+
+    tags и ingredients принимают имена через запятую без учета регистра.
+    tags_match и ingredients_match задают режим: any — есть хотя бы одно
+    из значений (по умолчанию), all — есть все значения. Фильтры
+    выполняются подзапросами EXISTS и GROUP BY ... HAVING COUNT по
+    связующим таблицам и не размножают строки рецептов.
+    """
+
+    tags = filters.CharFilter(method='filter_tags')
+    tags_match = filters.ChoiceFilter(
+        choices=MATCH_CHOICES, method='filter_match'
+    )
+    ingredients = filters.CharFilter(method='filter_ingredients')
+    ingredients_match = filters.ChoiceFilter(
+        choices=MATCH_CHOICES, method='filter_match'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'ingredients']
+        fields = [
+            'tags',
+            'tags_match',
+            'ingredients',
+            'ingredients_match',
+            'search',
+        ]
+
+    def filter_match(self, queryset, name, value):
+        """Режим сопоставления применяется в фильтре значений."""
+        return queryset
+
+    def _filter_related(self, queryset, links, name_field, value, match):
+        """
+        Фильтрует рецепты по именам связанных объектов.
+
+        links — выборка связующей таблицы с полем recipe_id,
+        name_field — путь к имени связанного объекта.
+        """
+        names = split_names(value)
+        if not names:
+            return queryset
+        links = links.annotate(name_lower=Lower(name_field)).filter(
+            name_lower__in=names
+        )
+        if self.form.cleaned_data.get(match) != MATCH_ALL:
+            return queryset.filter(
+                Exists(links.filter(recipe_id=OuterRef('pk')))
+            )
+        matched = (
+            links.order_by()
+            .values('recipe_id')
+            .annotate(matches=Count('name_lower', distinct=True))
+            .filter(matches=len(names))
+            .values('recipe_id')
+        )
+        return queryset.filter(pk__in=matched)
+
+    def filter_tags(self, queryset, name, value):
+        """Рецепты с тегами из списка."""
+        return self._filter_related(
+            queryset,
+            Recipe.tags.through.objects.all(),
+            'tag__name',
+            value,
+            'tags_match',
+        )
+
+    def filter_ingredients(self, queryset, name, value):
+        """Рецепты с ингредиентами из списка."""
+        return self._filter_related(
+            queryset,
+            RecipeIngredient.objects.all(),
+            'ingredient__name',
+            value,
+            'ingredients_match',
+        )
+
+    def filter_search(self, queryset, name, value):
+        """
+        Полнотекстовый поиск по названию и описанию рецепта.
+        Добавляет к рецептам релевантность search_rank. Она приводится
+        к double precision, чтобы позиция курсора пагинации точно
+        совпадала со значением в БД.
+        """
+        query = SearchQuery(value, config='russian', search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(
+                SearchRank(F('search_vector'), query), FloatField()
+            )
+        )
@@ -0,0 +1,108 @@
+"""
+Уменьшенные копии изображений рецептов.
+
+После загрузки изображения копии для миниатюры, карточки и полного
+просмотра создаются в WebP и JPEG фоновой задачей в очереди images,
+вне обработки запроса. Пути копий сохраняются в
+Recipe.image_renditions, пока они не готовы, поле пустое. Имена копий
+выводятся из имени исходного файла, которое задается хэшем содержимого,
+поэтому копии одинаковых изображений создаются один раз.
+"""
+
+import io
+import posixpath
+
+from core import jobs
+from core.models import Recipe
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from recipe.signals import recipes_changed
+
+RENDITIONS_DIR = 'uploads/recipe/renditions'
+
+# Название копии -> наибольшие ширина и высота.
+RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (640, 480),
+    'full': (1600, 1600),
+}
+
+# Формат -> (формат Pillow, расширение, параметры сохранения).
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 85, 'progressive': True}),
+}
+
+
+def render(image, size, pil_format, options):
+    """Возвращает содержимое копии изображения заданного размера."""
+    image = image.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def rendition_paths(name):
+    """
+    Возвращает пути копий изображения name:
+    название копии -> формат -> путь.
+    """
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    return {
+        rendition: {
+            key: posixpath.join(RENDITIONS_DIR, f'{stem}-{rendition}.{ext}')
+            for key, (_, ext, _) in FORMATS.items()
+        }
+        for rendition in RENDITIONS
+    }
+
+
+def delete_renditions(name):
+    """Удаляет копии изображения name."""
+    for paths in rendition_paths(name).values():
+        for path in paths.values():
+            default_storage.delete(path)
+
+
+@jobs.task(queue='images')
+def generate_renditions(recipe_id, name):
+    """
+    Создает недостающие копии изображения name и сохраняет их пути в
+    рецепте, если изображение рецепта с тех пор не заменили.
+    """
+    renditions = rendition_paths(name)
+    missing = [
+        (rendition, key, path)
+        for rendition, paths in renditions.items()
+        for key, path in paths.items()
+        if not default_storage.exists(path)
+    ]
+    if missing:
+        storage = Recipe._meta.get_field('image').storage
+        with storage.open(name) as f, Image.open(f) as original:
+            image = ImageOps.exif_transpose(original).convert('RGB')
+        for rendition, key, path in missing:
+            pil_format, _, options = FORMATS[key]
+            default_storage.save(
+                path,
+                ContentFile(
+                    render(image, RENDITIONS[rendition], pil_format, options)
+                ),
+            )
+
+    updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_renditions=renditions
+    )
+    if updated:
+        recipes_changed([recipe_id])
+
+
+def schedule_renditions(recipe):
+    """
+    Ставит создание копий изображения рецепта в очередь. Задача
+    появится в очереди вместе с фиксацией текущей транзакции.
+    """
+    generate_renditions.enqueue(recipe_id=recipe.pk, name=recipe.image.name)
@@ -0,0 +1,130 @@
+"""
+Индекс названий ингредиентов в памяти процесса.
+
+Каталог ингредиентов небольшой и почти не меняется, поэтому поиск по
+префиксу названия и поиск id по паре (название, единица измерения)
+выполняются без запросов к БД. Индекс строится при первом обращении и
+перестраивается, когда меняется версия каталога в кэше: версия
+сбрасывается после фиксации транзакции, изменившей ингредиенты.
+"""
+
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+
+from core.models import Ingredient
+from django.core.cache import cache
+from django.db import transaction
+
+from recipe.cache import get_version
+
+VERSION_KEY = 'recipe:ingredients:version'
+
+
+def normalize(name):
+    """
+    Возвращает ключ названия для поиска без учета регистра, как
+    lower() в уникальном индексе ingredient_name_unit_uniq.
+    """
+    return name.lower()
+
+
+def normalize_key(key):
+    """Возвращает ключ пары (название, единица измерения)."""
+    name, unit = key
+    return normalize(name), normalize(unit)
+
+
+class IngredientIndex:
+    """
+    Неизменяемый снимок каталога ингредиентов.
+
+    Ингредиенты хранятся в параллельных массивах, отсортированных по
+    ключу названия, поиск по префиксу выполняется бинарным поиском.
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda row: (normalize(row[1]), row[0]))
+        self._keys = [normalize(name) for _, name, _ in rows]
+        self._ids = array('q', (pk for pk, _, _ in rows))
+        self._names = [name for _, name, _ in rows]
+        self._units = [sys.intern(unit) for _, _, unit in rows]
+        self._by_name = {
+            normalize_key((name, unit)): pk for pk, name, unit in rows
+        }
+
+    @classmethod
+    def build(cls):
+        """Строит индекс одним запросом к БД."""
+        return cls(
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        )
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _item(self, position):
+        return {
+            'id': self._ids[position],
+            'name': self._names[position],
+            'measurement_unit': self._units[position],
+        }
+
+    def prefix(self, query, limit):
+        """
+        Возвращает до limit ингредиентов, название которых начинается
+        с query, в порядке названий.
+        """
+        key = normalize(query)
+        position = bisect_left(self._keys, key)
+        items = []
+        while (
+            len(items) < limit
+            and position < len(self._keys)
+            and self._keys[position].startswith(key)
+        ):
+            items.append(self._item(position))
+            position += 1
+        return items
+
+    def resolve(self, keys):
+        """
+        Возвращает словарь (название, единица измерения) -> id для
+        найденных в индексе ингредиентов без учета регистра.
+        """
+        found = {}
+        for key in keys:
+            pk = self._by_name.get(normalize_key(key))
+            if pk is not None:
+                found[key] = pk
+        return found
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """Возвращает индекс для текущей версии каталога."""
+    global _index, _index_version
+    version = get_version(VERSION_KEY)
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = IngredientIndex.build()
+            _index_version = version
+        return _index
+
+
+def clear():
+    """Сбрасывает индекс процесса."""
+    global _index, _index_version
+    with _lock:
+        _index = None
+        _index_version = None
+
+
+def invalidate():
+    """Сбрасывает версию каталога после фиксации транзакции."""
+    transaction.on_commit(lambda: cache.delete(VERSION_KEY))
@@ -0,0 +1,41 @@
+"""
+Пагинация для API рецептов.
+"""
+
+from core.pagination import EstimatedCountPaginator
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация рецептов по убыванию id.
+
+    Не выполняет COUNT(*) и выбирает страницу по индексу первичного
+    ключа, поэтому стоимость запроса не зависит от глубины страницы.
+    """
+
+    ordering = '-id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Результаты полнотекстового поиска упорядочиваются по
+        релевантности, при равной релевантности — по id.
+        """
+        if 'search_rank' in queryset.query.annotations:
+            return ('-search_rank', '-id')
+        return super().get_ordering(request, queryset, view)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с приблизительным подсчетом
+    общего числа объектов для больших таблиц.
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
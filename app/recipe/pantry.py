@@ -0,0 +1,165 @@
+"""
+Подбор рецептов по имеющимся ингредиентам.
+
+Индекс строится в памяти процесса из RecipeIngredient одним запросом:
+каждому названию ингредиента соответствует бит, у рецепта хранится
+маска его ингредиентов, а у названия — список рецептов с ним
+(инвертированный индекс). Рецепты-кандидаты берутся из списков по
+названиям из запроса, покрытие считается по маскам без запросов к БД.
+
+У индекса своя версия в кэше: она сбрасывается только при изменении
+связей рецептов с ингредиентами и названий ингредиентов, а через
+PANTRY_INDEX_TTL секунд истекает сама, поэтому изменения из других
+процессов видны и с кэшем в памяти процесса. Пока индекс новой версии
+строится в фоновом потоке, запросы получают прежний.
+"""
+
+import heapq
+import threading
+from array import array
+from collections import defaultdict
+
+from core.models import RecipeIngredient
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from recipe.cache import get_version
+from recipe.ingredient_index import normalize
+
+VERSION_KEY = 'recipe:pantry:version'
+
+PANTRY_LIMIT = 20
+MAX_PANTRY_LIMIT = 100
+
+
+class PantryIndex:
+    """Неизменяемый снимок состава рецептов."""
+
+    def __init__(self, rows):
+        self._bits = {}
+        self._masks = {}
+        self._names = defaultdict(list)
+        postings = defaultdict(list)
+        for recipe_id, name in rows:
+            key = normalize(name)
+            bit = self._bits.setdefault(key, 1 << len(self._bits))
+            mask = self._masks.get(recipe_id, 0)
+            if mask & bit:
+                continue
+            self._masks[recipe_id] = mask | bit
+            self._names[recipe_id].append(name)
+            postings[key].append(recipe_id)
+        self._postings = {
+            key: array('q', recipe_ids) for key, recipe_ids in postings.items()
+        }
+
+    @classmethod
+    def build(cls):
+        """Строит индекс одним запросом к БД."""
+        return cls(
+            RecipeIngredient.objects.order_by('id').values_list(
+                'recipe_id', 'ingredient__name'
+            )
+        )
+
+    def __len__(self):
+        return len(self._masks)
+
+    def match(self, names, limit=PANTRY_LIMIT):
+        """
+        Возвращает до limit рецептов, в которых есть хотя бы один из
+        ингредиентов names. Сначала идут рецепты с наибольшей долей
+        имеющихся ингредиентов, затем с меньшим числом недостающих.
+        """
+        keys = {normalize(name) for name in names}
+        pantry = 0
+        candidates = set()
+        for key in keys:
+            if key in self._bits:
+                pantry |= self._bits[key]
+                candidates.update(self._postings[key])
+
+        ranked = []
+        for recipe_id in candidates:
+            mask = self._masks[recipe_id]
+            total = mask.bit_count()
+            matched = (mask & pantry).bit_count()
+            ranked.append(
+                (matched / total, matched - total, recipe_id, matched, total)
+            )
+
+        return [
+            {
+                'recipe_id': recipe_id,
+                'coverage': round(coverage, 4),
+                'matched': matched,
+                'total': total,
+                'missing': [
+                    name
+                    for name in self._names[recipe_id]
+                    if normalize(name) not in keys
+                ],
+            }
+            for coverage, _, recipe_id, matched, total in heapq.nlargest(
+                limit, ranked
+            )
+        ]
+
+
+_index = None
+_index_version = None
+_rebuild_thread = None
+# Увеличивается в clear(), чтобы фоновая перестройка, начатая до
+# сброса, не подменила индекс.
+_generation = 0
+_lock = threading.Lock()
+
+
+def _rebuild(version, generation):
+    """Строит индекс версии version и подменяет им текущий."""
+    global _index, _index_version, _rebuild_thread
+    try:
+        index = PantryIndex.build()
+        with _lock:
+            if generation == _generation:
+                _index = index
+                _index_version = version
+    finally:
+        with _lock:
+            _rebuild_thread = None
+        connection.close()
+
+
+def get_index():
+    """
+    Возвращает индекс рецептов. Первый индекс процесса строится сразу,
+    при смене версии перестраивается в фоне, а до конца перестройки
+    возвращается прежний.
+    """
+    global _index, _index_version, _rebuild_thread
+    version = get_version(VERSION_KEY, settings.PANTRY_INDEX_TTL)
+    with _lock:
+        if _index is None:
+            _index = PantryIndex.build()
+            _index_version = version
+        elif _index_version != version and _rebuild_thread is None:
+            _rebuild_thread = threading.Thread(
+                target=_rebuild, args=(version, _generation), daemon=True
+            )
+            _rebuild_thread.start()
+        return _index
+
+
+def clear():
+    """Сбрасывает индекс процесса."""
+    global _index, _index_version, _generation
+    with _lock:
+        _index = None
+        _index_version = None
+        _generation += 1
+
+
+def invalidate():
+    """Сбрасывает версию индекса после фиксации транзакции."""
+    transaction.on_commit(lambda: cache.delete(VERSION_KEY))
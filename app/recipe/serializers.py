@@ -3,8 +3,18 @@ Cериализаторы для рецептов.
 """
 
 from core.models import Ingredient, Recipe, RecipeIngredient, Tag
+from django.db import transaction
+from django.db.models.functions import Lower
 from rest_framework import serializers
 
+from recipe import fastpath, ingredient_index, pantry
+from recipe.cache import invalidate_recipes
+
+# Ограничения запроса списка покупок: сумма количеств по всем рецептам
+# с порциями должна помещаться в bigint.
+SHOPPING_LIST_MAX_RECIPES = 100
+SHOPPING_LIST_MAX_SERVINGS = 1000
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для ингредиентов."""
@@ -14,6 +24,27 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('name', 'measurement_unit')
         read_only_fields = ('id',)
 
+    def validate(self, attrs):
+        """
+        Проверка, что ингредиента с таким названием и единицей
+        измерения без учета регистра еще нет.
+        """
+        name = attrs.get('name', getattr(self.instance, 'name', ''))
+        unit = attrs.get(
+            'measurement_unit',
+            getattr(self.instance, 'measurement_unit', ''),
+        )
+        duplicates = Ingredient.objects.annotate(
+            name_lower=Lower('name'), unit_lower=Lower('measurement_unit')
+        ).filter(name_lower=name.lower(), unit_lower=unit.lower())
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError(
+                'Такой ингредиент уже существует.'
+            )
+        return attrs
+
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор связи ингредиента с рецептом."""
@@ -55,14 +86,93 @@ class RecipeIngredientWriteSerializer(serializers.Serializer):
     amount = serializers.IntegerField(min_value=1)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Позволяет ограничить набор полей сериализатора.
+
+    fields — поля, которые нужно вернуть; expand — вложенные связи
+    из expandable_fields, которые нужно раскрыть (остальные опускаются).
+    """
+
+    expandable_fields = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            return
+        selected = self.select_fields(fields, expand)
+        for name in set(self.fields) - selected:
+            self.fields.pop(name)
+
+    @classmethod
+    def select_fields(cls, fields=None, expand=None):
+        """Возвращает имена полей, которые останутся в ответе."""
+        selected = set(cls.Meta.fields)
+        if fields is not None:
+            selected &= set(fields)
+        if expand is not None:
+            expandable = set(cls.expandable_fields)
+            selected -= expandable - set(expand)
+            selected |= expandable & set(expand)
+        return selected
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """
+    Пакетное создание рецептов: теги и ингредиенты всех рецептов
+    находятся общими запросами, рецепты и связи вставляются через
+    bulk_create.
+    """
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Создание рецептов."""
+        tags = [item.pop('tags', []) for item in validated_data]
+        ingredients = [item.pop('ingredients', []) for item in validated_data]
+        resolved_tags = self.child._resolve_tags(
+            tag['name'] for item in tags for tag in item
+        )
+        resolved_ingredients = self.child._resolve_ingredients(
+            (ing['name'], ing['measurement_unit'])
+            for item in ingredients
+            for ing in item
+        )
+
+        recipes = Recipe.objects.bulk_create(
+            Recipe(**item) for item in validated_data
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag_id=tag_id)
+            for recipe, item in zip(recipes, tags)
+            for tag_id in {resolved_tags[tag['name']].id for tag in item}
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=resolved_ingredients[
+                    (ing['name'], ing['measurement_unit'])
+                ],
+                amount=ing['amount'],
+            )
+            for recipe, item in zip(recipes, ingredients)
+            for ing in item
+        )
+        invalidate_recipes(recipe.pk for recipe in recipes)
+        pantry.invalidate()
+        return recipes
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для рецептов."""
 
+    expandable_fields = ('tags', 'ingredients_display')
+
     tags = TagSerializer(many=True)
     ingredients = RecipeIngredientWriteSerializer(many=True, write_only=True)
     ingredients_display = IngredientGetSerializer(
         source='recipeingredient_set', many=True, read_only=True
     )
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -75,36 +185,184 @@ class RecipeSerializer(serializers.ModelSerializer):
             'ingredients_display',
             'tags',
             'image',
+            'image_renditions',
         )
         read_only_fields = ('id',)
+        list_serializer_class = RecipeListSerializer
 
-    def _get_or_create_tags(self, tags, recipe):
-        """Функция для получения или обновления тега."""
+    def get_image_renditions(self, recipe):
+        """URL уменьшенных копий изображения, пока их нет — пустой словарь."""
+        return fastpath.rendition_urls(
+            recipe.image_renditions, self.context.get('request')
+        )
 
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                **tag,
+    def validate_ingredients(self, value):
+        """Проверка, что ингредиенты в рецепте не повторяются."""
+        keys = [
+            ingredient_index.normalize_key(
+                (ing['name'], ing['measurement_unit'])
+            )
+            for ing in value
+        ]
+        if len(keys) != len(set(keys)):
+            raise serializers.ValidationError(
+                'Ингредиенты в рецепте не должны повторяться.'
+            )
+        return value
+
+    def _resolve_tags(self, names):
+        """
+        Возвращает словарь имя -> тег, создавая недостающие теги
+        одним запросом.
+        """
+        names = set(names)
+        tags = {}
+        for tag in Tag.objects.filter(name__in=names).order_by('id'):
+            tags.setdefault(tag.name, tag)
+        missing = [Tag(name=name) for name in names if name not in tags]
+        for tag in Tag.objects.bulk_create(missing):
+            tags[tag.name] = tag
+        return tags
+
+    def _resolve_ingredients(self, keys):
+        """
+        Возвращает словарь (имя, единица измерения) -> ингредиент,
+        создавая недостающие ингредиенты одним запросом. Ингредиенты
+        сравниваются без учета регистра, известные берутся из индекса
+        каталога без запроса к БД.
+        """
+        keys = set(keys)
+        known = ingredient_index.get_index().resolve(keys)
+        ingredients = {
+            (name, unit): Ingredient(id=pk, name=name, measurement_unit=unit)
+            for (name, unit), pk in known.items()
+        }
+        unknown = {}
+        for key in keys - set(ingredients):
+            normalized = ingredient_index.normalize_key(key)
+            unknown.setdefault(normalized, []).append(key)
+        if not unknown:
+            return ingredients
+
+        self._select_ingredients(unknown, ingredients)
+        if unknown:
+            # Тот же ингредиент может одновременно создавать другой
+            # запрос: конфликт по ingredient_name_unit_uniq пропускается,
+            # а id всех ингредиентов берутся повторной выборкой.
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(name=same[0][0], measurement_unit=same[0][1])
+                    for same in unknown.values()
+                ),
+                ignore_conflicts=True,
             )
-            recipe.tags.add(tag_obj)
+            self._select_ingredients(unknown, ingredients)
+            ingredient_index.invalidate()
+        return ingredients
+
+    def _select_ingredients(self, unknown, ingredients):
+        """
+        Находит в БД ингредиенты для ключей из unknown без учета
+        регистра, добавляет их в ingredients и убирает из unknown.
+        """
+        existing = Ingredient.objects.annotate(
+            name_lower=Lower('name'), unit_lower=Lower('measurement_unit')
+        ).filter(
+            name_lower__in={name for name, _ in unknown},
+            unit_lower__in={unit for _, unit in unknown},
+        )
+        for ingredient in existing:
+            key = (ingredient.name, ingredient.measurement_unit)
+            for same in unknown.pop(ingredient_index.normalize_key(key), ()):
+                ingredients[same] = ingredient
+
+    def _get_or_create_tags(self, tags, recipe):
+        """Функция для получения или обновления тега."""
+        if not tags:
+            return recipe
+        resolved = self._resolve_tags(tag['name'] for tag in tags)
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for tag in resolved.values()
+        )
         return recipe
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Функция для получения или обновления ингредиента."""
-        for ing in ingredients:
-            ingredient_data = {
-                'name': ing['name'],
-                'measurement_unit': ing['measurement_unit'],
-            }
-            ingredient_obj, _ = Ingredient.objects.get_or_create(
-                **ingredient_data
-            )
-            RecipeIngredient.objects.create(
+        if not ingredients:
+            return recipe
+        resolved = self._resolve_ingredients(
+            (ing['name'], ing['measurement_unit']) for ing in ingredients
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 recipe=recipe,
-                ingredient=ingredient_obj,
+                ingredient=resolved[(ing['name'], ing['measurement_unit'])],
                 amount=ing['amount'],
             )
+            for ing in ingredients
+        )
+        pantry.invalidate()
+        return recipe
+
+    def _update_tags(self, tags, recipe):
+        """Обновляет теги рецепта, изменяя только отличающиеся связи."""
+        resolved = self._resolve_tags(tag['name'] for tag in tags)
+        desired = {tag.id for tag in resolved.values()}
+        current = set(recipe.tags.values_list('id', flat=True))
+        if current - desired:
+            recipe.tags.remove(*(current - desired))
+        if desired - current:
+            recipe.tags.add(*(desired - current))
         return recipe
 
+    def _update_ingredients(self, ingredients, recipe):
+        """
+        Обновляет ингредиенты рецепта: удаляет лишние связи, создает
+        новые и меняет количество только у изменившихся.
+        """
+        resolved = self._resolve_ingredients(
+            (ing['name'], ing['measurement_unit']) for ing in ingredients
+        )
+        desired = {
+            resolved[(ing['name'], ing['measurement_unit'])].id: ing['amount']
+            for ing in ingredients
+        }
+        current = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+
+        removed = [
+            row.id
+            for ingredient_id, row in current.items()
+            if ingredient_id not in desired
+        ]
+        if removed:
+            RecipeIngredient.objects.filter(id__in=removed).delete()
+
+        changed = []
+        for ingredient_id, amount in desired.items():
+            row = current.get(ingredient_id)
+            if row is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+
+        added = [
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in desired.items()
+            if ingredient_id not in current
+        ]
+        RecipeIngredient.objects.bulk_create(added)
+        if removed or added:
+            pantry.invalidate()
+        return recipe
+
+    @transaction.atomic
     def create(self, validated_data):
         """Создание рецепта."""
         tags = validated_data.pop('tags', [])
@@ -114,18 +372,17 @@ class RecipeSerializer(serializers.ModelSerializer):
         self._get_or_create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Обновление рецепта."""
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
 
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._update_tags(tags, instance)
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._update_ingredients(ingredients, instance)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -152,3 +409,40 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         fields = ('image',)
         read_only_fields = ('id',)
         extra_kwargs = {'image': {'required': 'True'}}
+
+
+class ShoppingListRecipeSerializer(serializers.Serializer):
+    """Рецепт и число порций в списке покупок."""
+
+    id = serializers.IntegerField(min_value=1)
+    servings = serializers.IntegerField(
+        min_value=1, max_value=SHOPPING_LIST_MAX_SERVINGS, default=1
+    )
+
+
+class ShoppingListSerializer(serializers.Serializer):
+    """Сериализатор запроса списка покупок."""
+
+    recipes = ShoppingListRecipeSerializer(
+        many=True, allow_empty=False, max_length=SHOPPING_LIST_MAX_RECIPES
+    )
+
+    def get_servings(self):
+        """
+        Возвращает словарь id рецепта -> число порций. Порции
+        повторяющихся рецептов складываются.
+        """
+        servings = {}
+        for recipe in self.validated_data['recipes']:
+            servings[recipe['id']] = (
+                servings.get(recipe['id'], 0) + recipe['servings']
+            )
+        return servings
+
+
+class ShoppingListItemSerializer(serializers.Serializer):
+    """Сериализатор строки списка покупок."""
+
+    name = serializers.CharField()
+    measurement_unit = serializers.CharField()
+    amount = serializers.IntegerField(source='total')
@@ -0,0 +1,66 @@
+"""
+Список покупок для набора рецептов.
+
+Количества суммируются в БД одним запросом с GROUP BY по названию и
+единице измерения ингредиента. Порции рецептов учитываются множителем
+CASE по id рецепта. Произведение и сумма считаются в bigint: amount
+хранится в smallint, и в integer произведение на порции переполняется.
+"""
+
+import csv
+
+from core.models import RecipeIngredient
+from django.db.models import BigIntegerField, Case, F, Sum, Value, When
+from django.db.models.functions import Cast
+
+CSV_HEADER = ('Ингредиент', 'Единицы измерения', 'Количество')
+
+
+def shopping_list(servings):
+    """
+    Возвращает выборку словарей name, measurement_unit, total.
+
+    servings — словарь id рецепта -> число порций. Несуществующие
+    рецепты не попадают в список.
+    """
+    amount = Cast('amount', BigIntegerField())
+    if any(count != 1 for count in servings.values()):
+        amount = amount * Case(
+            *(
+                When(recipe_id=recipe_id, then=Value(count))
+                for recipe_id, count in servings.items()
+            ),
+            output_field=BigIntegerField(),
+        )
+    return (
+        RecipeIngredient.objects.filter(recipe_id__in=servings)
+        .values(
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
+        )
+        .annotate(total=Sum(amount, output_field=BigIntegerField()))
+        .order_by('name', 'measurement_unit')
+    )
+
+
+class Echo:
+    """Буфер для csv.writer, который возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Генерирует строки CSV списка покупок."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in rows:
+        yield writer.writerow(
+            (row['name'], row['measurement_unit'], row['total'])
+        )
+
+
+def stream_text(rows):
+    """Генерирует строки текстового списка покупок."""
+    for row in rows:
+        yield f"{row['name']} — {row['total']} {row['measurement_unit']}\n"
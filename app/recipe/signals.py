@@ -0,0 +1,159 @@
+"""
+Сигналы для поддержки времени изменения рецептов, инвалидации кэша и
+счетчиков ссылок на изображения.
+"""
+
+from core.models import ImageFile, Ingredient, Recipe, RecipeIngredient, Tag
+from core.signals import recipe_ingredients_deleted
+from django.db.models import DEFERRED
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipe import ingredient_index, pantry
+from recipe.cache import invalidate_recipes
+
+
+def recipes_changed(recipe_ids):
+    """
+    Обновляет updated_at рецептов, представление которых изменилось,
+    и сбрасывает их кэш.
+    """
+    recipe_ids = set(recipe_ids)
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now()
+        )
+    invalidate_recipes(recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    """Сбрасывает кэш при изменении или удалении рецепта."""
+    invalidate_recipes([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Сбрасывает индекс подбора: связи рецепта удалены вместе с ним."""
+    pantry.invalidate()
+
+
+def _image_name(instance):
+    """
+    Возвращает имя изображения рецепта без обращения к БД или DEFERRED,
+    если поле не загружено.
+    """
+    value = instance.__dict__.get('image', DEFERRED)
+    if value is DEFERRED:
+        return value
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_init, sender=Recipe)
+def remember_recipe_image(sender, instance, **kwargs):
+    """Запоминает изображение рецепта, чтобы заметить его замену."""
+    instance._saved_image = _image_name(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, created, using, **kwargs):
+    """
+    Переносит ссылку со старого изображения рецепта на новое. Если старое
+    изображение не загружалось из БД, ссылка на него остается.
+    """
+    name = _image_name(instance)
+    if name is DEFERRED:
+        return
+    old_name = '' if created else instance._saved_image
+    if name != old_name:
+        files = ImageFile.objects.db_manager(using)
+        files.acquire(name)
+        if old_name is not DEFERRED:
+            files.release(old_name)
+    instance._saved_image = name
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_image_deleted(sender, instance, using, **kwargs):
+    """Удаляет ссылку на изображение удаленного рецепта."""
+    name = _image_name(instance)
+    if name is not DEFERRED:
+        ImageFile.objects.db_manager(using).release(name)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    """
+    Отмечает изменение рецепта при сохранении его ингредиента.
+    bulk_create и bulk_update сериализаторов этот сигнал не отправляют.
+    """
+    recipes_changed([instance.recipe_id])
+    pantry.invalidate()
+
+
+@receiver(recipe_ingredients_deleted, sender=RecipeIngredient)
+def recipe_ingredients_removed(sender, recipe_ids, **kwargs):
+    """
+    Отмечает изменение рецептов одним запросом на удаление их связей.
+    При удалении самого рецепта связи удаляются каскадом без сигнала.
+    """
+    recipes_changed(recipe_ids)
+    pantry.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    """Отмечает изменение рецептов с измененным или удаляемым тегом."""
+    recipes_changed(
+        Recipe.tags.through.objects.filter(tag_id=instance.pk).values_list(
+            'recipe_id', flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    """
+    Отмечает изменение рецептов с измененным или удаляемым ингредиентом
+    и сбрасывает индексы каталога ингредиентов и подбора рецептов.
+    """
+    ingredient_index.invalidate()
+    pantry.invalidate()
+    recipes_changed(
+        RecipeIngredient.objects.filter(
+            ingredient_id=instance.pk
+        ).values_list('recipe_id', flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Отмечает изменение рецептов при изменении их тегов и ингредиентов."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if sender is Recipe.ingredients.through:
+        pantry.invalidate()
+    if not reverse:
+        recipes_changed([instance.pk])
+    elif pk_set is not None:
+        recipes_changed(pk_set)
+    else:
+        field = f'{instance._meta.model_name}_id'
+        recipes_changed(
+            sender.objects.filter(**{field: instance.pk}).values_list(
+                'recipe_id', flat=True
+            )
+        )
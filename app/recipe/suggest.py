@@ -0,0 +1,72 @@
+"""
+Подсказки ингредиентов по части названия.
+
+Сначала идут ингредиенты, название которых начинается с запроса: они
+берутся из индекса каталога в памяти процесса. Если их меньше limit,
+остальные ищутся в БД. При установленном расширении pg_trgm это
+оператор сходства триграмм (%) по индексу ingredient_name_trgm_idx с
+сортировкой по similarity(), без расширения — ILIKE.
+"""
+
+from core.models import Ingredient
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Length
+
+from recipe import ingredient_index
+
+SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 50
+
+_trigram_available = {}
+
+
+def trigram_available(using):
+    """Проверяет, установлено ли расширение pg_trgm в базе."""
+    if using not in _trigram_available:
+        connection = connections[using]
+        available = False
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+                )
+                available = cursor.fetchone() is not None
+        _trigram_available[using] = available
+    return _trigram_available[using]
+
+
+def search_ingredients(query):
+    """Возвращает ингредиенты, похожие на query, в порядке сходства."""
+    queryset = Ingredient.objects.all()
+    if trigram_available(queryset.db):
+        return (
+            queryset.filter(name__trigram_similar=query)
+            .annotate(similarity=TrigramSimilarity('name', query))
+            .order_by('-similarity', 'name', 'id')
+        )
+    return (
+        queryset.filter(name__icontains=query)
+        .annotate(
+            prefix=Case(
+                When(name__istartswith=query, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by('prefix', Length('name'), 'name', 'id')
+    )
+
+
+def suggest_ingredients(query, limit=SUGGEST_LIMIT):
+    """Возвращает до limit ингредиентов, похожих на query."""
+    items = ingredient_index.get_index().prefix(query, limit)
+    if len(items) < limit:
+        found = [item['id'] for item in items]
+        items.extend(
+            search_ingredients(query)
+            .exclude(id__in=found)
+            .values('id', 'name', 'measurement_unit')[: limit - len(items)]
+        )
+    return items
@@ -2,6 +2,8 @@
 Тест для API ингредиентов.
 """
 
+from unittest.mock import patch
+
 from core.models import Ingredient
 from django.contrib.auth import get_user_model
 from django.test import TestCase
@@ -9,9 +11,11 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from recipe import ingredient_index
 from recipe.serializers import IngredientSerializer
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
+SUGGEST_URL = reverse('recipe:ingredient-suggest')
 
 
 def detail_url(ingredient_id):
@@ -60,7 +64,7 @@ class PrivateIngredientApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """
@@ -74,9 +78,10 @@ class PrivateIngredientApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
-        self.assertEqual(res.data[0]['name'], ingredient1.name)
-        self.assertEqual(res.data[1]['name'], ingredient2.name)
+        results = res.data['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['name'], ingredient1.name)
+        self.assertEqual(results[1]['name'], ingredient2.name)
 
     def test_update_ingredient(self):
         """Тест обновления ингредиента."""
@@ -89,6 +94,19 @@ class PrivateIngredientApiTests(TestCase):
         ingredient.refresh_from_db()
         self.assertEqual(ingredient.name, payload['name'])
 
+    def test_update_ingredient_duplicate_error(self):
+        """Тест — нельзя переименовать ингредиент в уже существующий."""
+        Ingredient.objects.create(name='Корица', measurement_unit='г')
+        ingredient = Ingredient.objects.create(
+            name='Сахар', measurement_unit='г'
+        )
+
+        res = self.client.patch(detail_url(ingredient.id), {'name': 'корица'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, 'Сахар')
+
     def test_delete_ingredient(self):
         """Тест удаления ингредиента."""
         ingredient = Ingredient.objects.create(name='Мука')
@@ -99,3 +117,120 @@ class PrivateIngredientApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         ingredients = Ingredient.objects.filter(name='Мука')
         self.assertFalse(ingredients.exists())
+
+    def test_small_table_exact_count(self):
+        """Тест — для небольшой таблицы выполняется точный подсчет."""
+        Ingredient.objects.create(name='Соль')
+        Ingredient.objects.create(name='Перец')
+
+        res = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 2)
+
+    @patch(
+        'core.pagination.EstimatedCountPaginator._estimate_count',
+        return_value=50000,
+    )
+    def test_large_table_estimated_count(self, patched_estimate):
+        """Тест — для большой таблицы используется оценка числа строк."""
+        Ingredient.objects.create(name='Соль')
+
+        res = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 50000)
+        self.assertEqual(len(res.data['results']), 1)
+        patched_estimate.assert_called_once()
+
+    @patch(
+        'core.pagination.EstimatedCountPaginator._estimate_count',
+        return_value=2,
+    )
+    @patch('core.pagination.EstimatedCountPaginator.estimate_threshold', 1)
+    def test_rows_beyond_estimate_reachable(self, patched_estimate):
+        """Тест — строки за пределами оценки доступны постранично."""
+        for name in ('А', 'Б', 'В', 'Г', 'Д'):
+            Ingredient.objects.create(name=name)
+
+        res = self.client.get(INGREDIENTS_URL, {'page_size': 2})
+        self.assertEqual(res.data['count'], 2)
+        self.assertIsNotNone(res.data['next'])
+
+        res = self.client.get(INGREDIENTS_URL, {'page_size': 2, 'page': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(res.data['next'])
+
+        res = self.client.get(INGREDIENTS_URL, {'page_size': 2, 'page': 3})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIsNone(res.data['next'])
+
+        res = self.client.get(INGREDIENTS_URL, {'page_size': 2, 'page': 4})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_estimate_count_query(self):
+        """Тест — оценка числа строк читается из статистики PostgreSQL."""
+        with self.assertNumQueries(2):
+            res = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 0)
+
+
+class IngredientSuggestTests(TestCase):
+    """Тест подсказок ингредиентов."""
+
+    def setUp(self):
+        ingredient_index.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Ingredient.objects.create(name='Молоко топленое')
+        Ingredient.objects.create(name='Молоко')
+        Ingredient.objects.create(name='Соль')
+
+    def test_suggest_ingredients(self):
+        """Тест — сначала идут наиболее похожие ингредиенты."""
+        res = self.client.get(SUGGEST_URL, {'q': 'молоко'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [item['name'] for item in res.data]
+        self.assertEqual(names, ['Молоко', 'Молоко топленое'])
+
+    def test_suggest_limit(self):
+        """Тест — число подсказок ограничивается параметром limit."""
+        res = self.client.get(SUGGEST_URL, {'q': 'молоко', 'limit': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, [{'name': 'Молоко', 'measurement_unit': 'грамм'}]
+        )
+
+    def test_suggest_invalid_params(self):
+        """Тест — пустой запрос и неверный limit отклоняются."""
+        for params in ({}, {'q': ' '}, {'q': 'соль', 'limit': 0}):
+            res = self.client.get(SUGGEST_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_suggest_prefix_from_index(self):
+        """Тест — подсказки по префиксу не обращаются к БД."""
+        ingredient_index.get_index()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(SUGGEST_URL, {'q': 'МОЛ', 'limit': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [item['name'] for item in res.data]
+        self.assertEqual(names, ['Молоко', 'Молоко топленое'])
+
+    def test_index_rebuilt_after_change(self):
+        """Тест — индекс перестраивается после изменения каталога."""
+        ingredient_index.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Мольский сыр')
+
+        res = self.client.get(SUGGEST_URL, {'q': 'моль', 'limit': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['name'], 'Мольский сыр')
@@ -2,20 +2,39 @@
 Тест API рецепта.
 """
 
+import json
 import os
 import tempfile
-
-from core.models import Ingredient, Recipe, RecipeIngredient, Tag
+from io import StringIO
+from unittest.mock import patch
+
+from core.models import (
+    ImageFile,
+    Ingredient,
+    Job,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+)
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from PIL import Image
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from recipe import images, ingredient_index, pantry
 from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+from recipe.views import RecipeViewSet
 
 RECIPES_URL = reverse('recipe:recipe-list')
+PANTRY_URL = reverse('recipe:recipe-pantry')
+BULK_URL = reverse('recipe:recipe-bulk-create')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def detail_url(recipe_id):
@@ -53,6 +72,7 @@ class PublicRecipApiTests(TestCase):
     """Тест неаутентифицированных запросов."""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = create_user(username='testUser1', password='testpass123')
         self.recipe = Recipe.objects.create(
@@ -92,8 +112,9 @@ class PublicRecipApiTests(TestCase):
         response = self.client.get(RECIPES_URL, {'tags': 'Завтрак'})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], self.recipe1.title)
+        results = response.data['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['title'], self.recipe1.title)
 
     def test_filter_recipes_by_ingredients(self):
         """Тест фильтрации рецептов по ингредиенту."""
@@ -115,8 +136,9 @@ class PublicRecipApiTests(TestCase):
 
         res = self.client.get(RECIPES_URL, {'ingredients': 'Помидоры'})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['title'], self.recipe1.title)
+        results = res.data['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['title'], self.recipe1.title)
 
     def test_filter_recipes_multiple_parameters(self):
         """Тест фильтрации рецептов по нескольким параметрам."""
@@ -129,8 +151,61 @@ class PublicRecipApiTests(TestCase):
         )
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], self.recipe2.title)
+        results = response.data['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['title'], self.recipe2.title)
+
+    def test_filter_any_of_tags(self):
+        """Тест — рецепты хотя бы с одним из тегов, без повторов."""
+        self.recipe1.tags.add(self.tag_dinner)
+
+        res = self.client.get(RECIPES_URL, {'tags': 'завтрак, Ужин'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertEqual(titles, ['Паста', 'Омлет'])
+
+    def test_filter_all_of_tags(self):
+        """Тест — рецепты со всеми тегами из списка."""
+        self.recipe1.tags.add(self.tag_dinner)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                RECIPES_URL, {'tags': 'Завтрак,Ужин', 'tags_match': 'all'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertEqual(titles, ['Омлет'])
+        for query in queries:
+            self.assertNotIn('SELECT DISTINCT', query['sql'])
+
+    def test_filter_all_of_ingredients_and_tags(self):
+        """Тест — режимы тегов и ингредиентов задаются отдельно."""
+        RecipeIngredient.objects.create(
+            recipe=self.recipe1, ingredient=self.ingredient_cheese, amount=50
+        )
+
+        res = self.client.get(
+            RECIPES_URL,
+            {
+                'ingredients': 'Яйцо,Сыр',
+                'ingredients_match': 'all',
+                'tags': 'Завтрак,Обед',
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertEqual(titles, ['Омлет'])
+
+    def test_filter_invalid_match(self):
+        """Тест — неизвестный режим фильтра возвращает ошибку."""
+        res = self.client.get(
+            RECIPES_URL, {'tags': 'Завтрак', 'tags_match': 'some'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_unauthorized_user_cannot_create_recipe(self):
         """
@@ -160,6 +235,7 @@ class PrivateRecipeApiTests(TestCase):
     """Тест рецепта для аутентифицированных пользователей."""
 
     def setUp(self):
+        ingredient_index.clear()
         self.client = APIClient()
         self.user = create_user(username='testUser1', password='testpass123')
         self.client.force_authenticate(self.user)
@@ -176,7 +252,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """Тест — получение рецепта по id."""
@@ -427,6 +503,124 @@ class PrivateRecipeApiTests(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def test_create_recipe_query_count_constant(self):
+        """Тест — число запросов создания не зависит от числа ингредиентов."""
+        Ingredient.objects.create(name='Ингредиент 0', measurement_unit='г')
+        Tag.objects.create(name='Тег 0')
+        ingredient_index.get_index()
+
+        for count in (2, 20):
+            payload = {
+                'title': f'Рецепт на {count} ингредиентов',
+                'cooking_time': 30,
+                'ingredients': [
+                    {
+                        'name': f'Ингредиент {i}',
+                        'measurement_unit': 'г',
+                        'amount': i + 1,
+                    }
+                    for i in range(count)
+                ],
+                'tags': [{'name': f'Тег {i}'} for i in range(count)],
+            }
+            with self.assertNumQueries(13):
+                res = self.client.post(RECIPES_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            recipe = Recipe.objects.get(id=res.data['id'])
+            self.assertEqual(recipe.ingredients.count(), count)
+            self.assertEqual(recipe.tags.count(), count)
+
+        self.assertEqual(
+            Ingredient.objects.filter(name='Ингредиент 0').count(), 1
+        )
+        self.assertEqual(Tag.objects.filter(name='Тег 0').count(), 1)
+
+    def test_create_recipe_ingredient_created_concurrently(self):
+        """Тест — ингредиент, созданный параллельным запросом, не дает 500."""
+        select = RecipeSerializer._select_ingredients
+
+        def racing(serializer, unknown, ingredients):
+            select(serializer, unknown, ingredients)
+            if not Ingredient.objects.filter(name='шафран').exists():
+                Ingredient.objects.create(name='шафран', measurement_unit='Г')
+
+        payload = {
+            'title': 'Плов',
+            'cooking_time': 60,
+            'ingredients': [
+                {'name': 'Шафран', 'measurement_unit': 'г', 'amount': 1}
+            ],
+            'tags': [],
+        }
+        with patch.object(
+            RecipeSerializer,
+            '_select_ingredients',
+            autospec=True,
+            side_effect=racing,
+        ):
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        ingredient = Ingredient.objects.get(name__iexact='шафран')
+        self.assertEqual(
+            list(Recipe.objects.get(id=res.data['id']).ingredients.all()),
+            [ingredient],
+        )
+
+    def test_create_recipe_known_ingredients_from_index(self):
+        """Тест — известные ингредиенты не ищутся в БД при создании."""
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        ingredient_index.get_index()
+        payload = {
+            'title': 'Рецепт',
+            'cooking_time': 30,
+            'ingredients': [
+                {'name': 'Соль', 'measurement_unit': 'г', 'amount': 2}
+            ],
+            'tags': [],
+        }
+        with self.assertNumQueries(7):
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(list(recipe.ingredients.all()), [salt])
+
+    def test_create_recipe_reuses_ingredient_ignoring_case(self):
+        """Тест — ингредиент сопоставляется без учета регистра."""
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        payload = {
+            'title': 'Рецепт',
+            'cooking_time': 30,
+            'ingredients': [
+                {'name': 'соль', 'measurement_unit': 'Г', 'amount': 2}
+            ],
+            'tags': [],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(list(recipe.ingredients.all()), [salt])
+        self.assertEqual(Ingredient.objects.count(), 1)
+
+    def test_create_recipe_duplicate_ingredients_error(self):
+        """Тест — повторяющиеся ингредиенты в рецепте возвращают ошибку."""
+        payload = {
+            'title': 'Название рецепта',
+            'cooking_time': 30,
+            'ingredients': [
+                {'name': 'Мука', 'measurement_unit': 'г', 'amount': 20},
+                {'name': 'Мука', 'measurement_unit': 'г', 'amount': 10},
+            ],
+            'tags': [],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
     def test_create_ingredient_on_update(self):
         """Тест создания ингредиента при обновлении рецепта."""
         recipe = create_recipe(user=self.user)
@@ -478,6 +672,53 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn('Сахар', ingredient_names)
         self.assertNotIn('Соль', ingredient_names)
 
+    def test_update_ingredient_amount_keeps_rows(self):
+        """
+        Тест — изменение количества обновляет только изменившуюся связь,
+        не пересоздавая остальные.
+        """
+        flour = Ingredient.objects.create(name='Мука', measurement_unit='г')
+        sugar = Ingredient.objects.create(name='Сахар', measurement_unit='г')
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        tag = Tag.objects.create(name='Выпечка')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        flour_row = RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=flour, amount=200
+        )
+        sugar_row = RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=sugar, amount=50
+        )
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=salt, amount=1
+        )
+
+        payload = {
+            'ingredients': [
+                {'name': 'Мука', 'measurement_unit': 'г', 'amount': 250},
+                {'name': 'Сахар', 'measurement_unit': 'г', 'amount': 50},
+                {'name': 'Масло', 'measurement_unit': 'г', 'amount': 100},
+            ],
+            'tags': [{'name': 'Выпечка'}, {'name': 'Десерт'}],
+        }
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rows = {
+            row.ingredient.name: row
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        self.assertEqual(set(rows), {'Мука', 'Сахар', 'Масло'})
+        self.assertEqual(rows['Мука'].id, flour_row.id)
+        self.assertEqual(rows['Мука'].amount, 250)
+        self.assertEqual(rows['Сахар'].id, sugar_row.id)
+        self.assertEqual(rows['Масло'].amount, 100)
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)),
+            {'Выпечка', 'Десерт'},
+        )
+        self.assertEqual(len(res.data['ingredients_display']), 3)
+
     def test_clear_recipe_ingredient(self):
         """Тест удаления ингредиентов рецепта."""
         ingredient = Ingredient.objects.create(
@@ -498,6 +739,770 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(recipe.ingredients.count(), 0)
 
 
+class RecipeQueryCountTests(TestCase):
+    """Тесты количества запросов к БД при чтении рецептов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def _create_recipes(self, count):
+        """Создает рецепты с тегами и ингредиентами."""
+        for i in range(count):
+            recipe = create_recipe(user=self.user, title=f'Рецепт {i}')
+            recipe.tags.add(
+                Tag.objects.create(name=f'Тег {i}'),
+                Tag.objects.create(name=f'Другой тег {i}'),
+            )
+            for j in range(3):
+                ingredient, _ = Ingredient.objects.get_or_create(
+                    name=f'Ингредиент {i}-{j}', measurement_unit='г'
+                )
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=j + 1
+                )
+
+    def test_list_query_count_constant(self):
+        """Тест — число запросов списка не зависит от числа рецептов."""
+        self._create_recipes(2)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self._create_recipes(10)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual(len(results), 12)
+        self.assertEqual(len(results[0]['ingredients_display']), 3)
+        self.assertEqual(len(results[0]['tags']), 2)
+
+    def test_detail_query_count(self):
+        """Тест — получение рецепта выполняет фиксированное число запросов."""
+        self._create_recipes(1)
+        recipe = Recipe.objects.get()
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
+
+    def _recipe_with_ingredients(self, count):
+        """Создает рецепт с count ингредиентами."""
+        recipe = create_recipe(user=self.user)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=Ingredient.objects.create(
+                    name=f'Ингредиент {i}', measurement_unit='г'
+                ),
+                amount=i + 1,
+            )
+            for i in range(count)
+        )
+        ingredient_index.clear()
+        ingredient_index.get_index()
+        return recipe
+
+    def test_update_removing_ingredients_query_count(self):
+        """Тест — удаление ингредиентов не обновляет рецепт построчно."""
+        recipe = self._recipe_with_ingredients(30)
+        payload = {
+            'ingredients': [
+                {'name': 'Ингредиент 0', 'measurement_unit': 'г', 'amount': 1},
+                {'name': 'Ингредиент 1', 'measurement_unit': 'г', 'amount': 5},
+            ]
+        }
+        updated_at = recipe.updated_at
+
+        with self.assertNumQueries(14):
+            res = self.client.patch(
+                detail_url(recipe.id), payload, format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipe.recipeingredient_set.count(), 2)
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, updated_at)
+
+    def test_delete_recipe_query_count(self):
+        """Тест — удаление рецепта удаляет связи одним запросом."""
+        recipe = self._recipe_with_ingredients(30)
+
+        with self.assertNumQueries(6):
+            res = self.client.delete(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(RecipeIngredient.objects.exists())
+
+    def test_sparse_fields_skip_prefetch(self):
+        """Тест — ?fields= без вложенных связей выполняет один запрос."""
+        self._create_recipes(3)
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                RECIPES_URL, {'fields': 'id,title,cooking_time'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in res.data['results']:
+            self.assertEqual(set(recipe), {'id', 'title', 'cooking_time'})
+
+    def test_expand_selected_relation(self):
+        """Тест — ?expand= подгружает только указанные связи."""
+        self._create_recipes(3)
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                RECIPES_URL, {'fields': 'id,title', 'expand': 'tags'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in res.data['results']:
+            self.assertEqual(set(recipe), {'id', 'title', 'tags'})
+            self.assertEqual(len(recipe['tags']), 2)
+
+    def test_expand_omits_other_relations(self):
+        """Тест — связи, не указанные в ?expand=, не возвращаются."""
+        self._create_recipes(1)
+        recipe = Recipe.objects.get()
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                detail_url(recipe.id), {'expand': 'ingredients_display'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('tags', res.data)
+        self.assertIn('link', res.data)
+        self.assertEqual(len(res.data['ingredients_display']), 3)
+
+
+class RecipeFastListTests(TestCase):
+    """Тесты быстрого чтения списка рецептов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        breakfast = Tag.objects.create(name='Завтрак')
+        dinner = Tag.objects.create(name='Ужин')
+        egg = Ingredient.objects.create(name='Яйцо', measurement_unit='шт')
+        milk = Ingredient.objects.create(name='Молоко', measurement_unit='мл')
+
+        omelette = create_recipe(user=self.user, title='Омлет')
+        omelette.tags.add(dinner, breakfast)
+        RecipeIngredient.objects.create(
+            recipe=omelette, ingredient=milk, amount=100
+        )
+        RecipeIngredient.objects.create(
+            recipe=omelette, ingredient=egg, amount=3
+        )
+        omelette.image = 'uploads/recipe/omelette.jpg'
+        omelette.save()
+        create_recipe(user=self.user, title='Вода', description='')
+
+    def _get_both(self, params=None):
+        """Возвращает ответы обычного и быстрого списка."""
+        with override_settings(RECIPE_FAST_LIST=False):
+            slow = self.client.get(RECIPES_URL, params)
+        with override_settings(RECIPE_FAST_LIST=True):
+            fast = self.client.get(RECIPES_URL, params)
+        return slow, fast
+
+    def test_fast_list_same_json(self):
+        """Тест — быстрый список возвращает тот же JSON, что сериализатор."""
+        slow, fast = self._get_both()
+
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.content, slow.content)
+        self.assertTrue(
+            fast.data['results'][1]['image'].endswith(
+                '/static/media/uploads/recipe/omelette.jpg'
+            )
+        )
+
+    def test_fast_list_same_json_with_params(self):
+        """Тест — фильтры, поля и пагинация не меняют вывод."""
+        for params in (
+            {'tags': 'Завтрак'},
+            {'fields': 'id,title', 'expand': 'tags'},
+            {'page_size': 1},
+            {'search': 'омлет'},
+        ):
+            slow, fast = self._get_both(params)
+            self.assertEqual(fast.content, slow.content)
+
+    @override_settings(RECIPE_FAST_LIST=True)
+    def test_fast_list_query_count(self):
+        """Тест — быстрый список выполняет фиксированное число запросов."""
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class RecipeCacheTests(TestCase):
+    """Тесты кэша ответов для анонимных пользователей."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.tag = Tag.objects.create(name='Завтрак')
+        self.ingredient = Ingredient.objects.create(
+            name='Яйцо', measurement_unit='шт'
+        )
+        self.recipe = create_recipe(user=self.user, title='Омлет')
+        self.recipe.tags.add(self.tag)
+        RecipeIngredient.objects.create(
+            recipe=self.recipe, ingredient=self.ingredient, amount=2
+        )
+        self.other_recipe = create_recipe(user=self.user, title='Паста')
+
+    def test_list_served_from_cache(self):
+        """Тест — повторный запрос списка не обращается к БД."""
+        res = self.client.get(RECIPES_URL)
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPES_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.content, res.content)
+
+    def test_filter_params_normalized(self):
+        """Тест — регистр и порядок фильтров не создают новых записей."""
+        self.client.get(RECIPES_URL, {'tags': 'Завтрак', 'page_size': 5})
+        with self.assertNumQueries(0):
+            res = self.client.get(
+                RECIPES_URL, {'page_size': 5, 'tags': 'завтрак'}
+            )
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_recipe_update_invalidates_cache(self):
+        """Тест — изменение рецепта сбрасывает кэш списка и рецепта."""
+        self.client.get(RECIPES_URL)
+        self.client.get(detail_url(self.recipe.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.title = 'Омлет с сыром'
+            self.recipe.save()
+
+        res = self.client.get(RECIPES_URL)
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertIn('Омлет с сыром', titles)
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data['title'], 'Омлет с сыром')
+
+    def test_ingredient_update_invalidates_recipe(self):
+        """Тест — изменение ингредиента сбрасывает кэш его рецептов."""
+        self.client.get(detail_url(self.recipe.id))
+        self.client.get(detail_url(self.other_recipe.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredient.name = 'Перепелиное яйцо'
+            self.ingredient.save()
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(
+            res.data['ingredients_display'][0]['name'], 'Перепелиное яйцо'
+        )
+        with self.assertNumQueries(0):
+            self.client.get(detail_url(self.other_recipe.id))
+
+    def test_tag_links_invalidate_recipe(self):
+        """Тест — изменение тегов рецепта сбрасывает его кэш."""
+        self.client.get(detail_url(self.other_recipe.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.recipe_set.add(self.other_recipe)
+
+        res = self.client.get(detail_url(self.other_recipe.id))
+        self.assertEqual(res.data['tags'], [{'name': 'Завтрак'}])
+
+    def test_delete_recipe_invalidates_list(self):
+        """Тест — удаление рецепта сбрасывает кэш списка."""
+        self.client.get(RECIPES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_recipe.delete()
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_authenticated_not_cached(self):
+        """Тест — запросы аутентифицированных пользователей не кэшируются."""
+        self.client.force_authenticate(self.user)
+        self.client.get(RECIPES_URL)
+        with self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
+
+
+class RecipeConditionalGetTests(TestCase):
+    """Тесты условных GET-запросов рецепта."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.url = detail_url(self.recipe.id)
+
+    def test_detail_has_validators(self):
+        """Тест — ответ содержит ETag и Last-Modified."""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', res)
+
+    def test_if_none_match_not_modified(self):
+        """Тест — совпавший ETag возвращает 304 за один запрос к БД."""
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_if_modified_since_not_modified(self):
+        """Тест — If-Modified-Since без изменений возвращает 304."""
+        last_modified = self.client.get(self.url)['Last-Modified']
+
+        res = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_depends_on_fields(self):
+        """Тест — ETag отличается для разных наборов полей."""
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.get(
+            self.url, {'fields': 'id,title'}, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_tag_link_changes_etag(self):
+        """Тест — добавление тега обновляет updated_at и ETag."""
+        etag = self.client.get(self.url)['ETag']
+        updated_at = self.recipe.updated_at
+
+        self.recipe.tags.add(Tag.objects.create(name='Ужин'))
+
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, updated_at)
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'], [{'name': 'Ужин'}])
+
+    def test_ingredient_link_changes_updated_at(self):
+        """Тест — изменение ингредиентов рецепта обновляет updated_at."""
+        ingredient = Ingredient.objects.create(name='Соль')
+        updated_at = self.recipe.updated_at
+
+        RecipeIngredient.objects.create(
+            recipe=self.recipe, ingredient=ingredient, amount=1
+        )
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, updated_at)
+
+        updated_at = self.recipe.updated_at
+        ingredient.name = 'Морская соль'
+        ingredient.save()
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, updated_at)
+
+    def test_ingredient_link_delete_changes_updated_at(self):
+        """Тест — удаление связей с ингредиентами обновляет updated_at."""
+        salt, pepper = (
+            RecipeIngredient.objects.create(
+                recipe=self.recipe,
+                ingredient=Ingredient.objects.create(name=name),
+                amount=1,
+            )
+            for name in ('Соль', 'Перец')
+        )
+        self.recipe.refresh_from_db()
+        updated_at = self.recipe.updated_at
+
+        with self.assertNumQueries(3):
+            RecipeIngredient.objects.filter(pk=salt.pk).delete()
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, updated_at)
+
+        updated_at = self.recipe.updated_at
+        pepper.delete()
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, updated_at)
+
+
+class RecipeSearchTests(TestCase):
+    """Тесты полнотекстового поиска рецептов."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.omelette = create_recipe(
+            user=self.user, title='Омлет', description='Яйца и молоко'
+        )
+        self.pasta = create_recipe(
+            user=self.user,
+            title='Паста',
+            description='Подается с омлетом и сыром',
+        )
+        self.soup = create_recipe(
+            user=self.user, title='Суп', description='Овощной суп'
+        )
+
+    def test_search_ranked(self):
+        """Тест — совпадение в названии выше совпадения в описании."""
+        res = self.client.get(RECIPES_URL, {'search': 'омлеты'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertEqual(titles, ['Омлет', 'Паста'])
+
+    def test_search_with_cursor_pagination(self):
+        """Тест — поиск работает с курсорной пагинацией."""
+        res = self.client.get(
+            RECIPES_URL, {'search': 'омлет', 'page_size': 1}
+        )
+        titles = [recipe['title'] for recipe in res.data['results']]
+        res = self.client.get(res.data['next'])
+        titles.extend(recipe['title'] for recipe in res.data['results'])
+
+        self.assertEqual(titles, ['Омлет', 'Паста'])
+        self.assertIsNone(res.data['next'])
+
+    @override_settings(RECIPE_FAST_LIST=False)
+    def test_search_serializer_path(self):
+        """Тест — поиск работает без быстрого чтения списка."""
+        res = self.client.get(RECIPES_URL, {'search': 'омлет'})
+
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertEqual(titles, ['Омлет', 'Паста'])
+
+    def test_search_vector_updated_on_save(self):
+        """Тест — поисковый вектор обновляется при изменении рецепта."""
+        self.soup.title = 'Грибной суп'
+        self.soup.save()
+
+        res = self.client.get(RECIPES_URL, {'search': 'грибного'})
+
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertEqual(titles, ['Грибной суп'])
+
+
+class RecipePaginationTests(TestCase):
+    """Тесты курсорной пагинации списка рецептов."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        for i in range(5):
+            create_recipe(user=self.user, title=f'Рецепт {i}')
+
+    def test_paginate_recipes_with_cursor(self):
+        """Тест — обход всех страниц по курсору без пропусков и повторов."""
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', res.data)
+        self.assertIsNone(res.data['previous'])
+
+        ids = [recipe['id'] for recipe in res.data['results']]
+        next_url = res.data['next']
+        while next_url:
+            res = self.client.get(next_url)
+            ids.extend(recipe['id'] for recipe in res.data['results'])
+            next_url = res.data['next']
+
+        expected = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_page_size_limited(self):
+        """Тест — размер страницы ограничен максимальным значением."""
+        res = self.client.get(RECIPES_URL, {'page_size': 1000})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertIsNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        """Тест — некорректный курсор возвращает ошибку."""
+        res = self.client.get(RECIPES_URL, {'cursor': 'invalid'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RecipePantryTests(TestCase):
+    """Тесты подбора рецептов по имеющимся ингредиентам."""
+
+    def setUp(self):
+        cache.clear()
+        pantry.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        egg = Ingredient.objects.create(name='Яйцо', measurement_unit='шт')
+        milk = Ingredient.objects.create(name='Молоко', measurement_unit='мл')
+        flour = Ingredient.objects.create(name='Мука', measurement_unit='г')
+        cucumber = Ingredient.objects.create(
+            name='Огурец', measurement_unit='шт'
+        )
+        for title, ingredients in (
+            ('Омлет', (egg, milk)),
+            ('Блины', (egg, milk, flour)),
+            ('Салат', (cucumber,)),
+        ):
+            recipe = create_recipe(user=self.user, title=title)
+            for ingredient in ingredients:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+
+    def test_recipes_ranked_by_coverage(self):
+        """Тест — рецепты упорядочены по доле имеющихся ингредиентов."""
+        res = self.client.get(PANTRY_URL, {'ingredients': 'яйцо, Молоко'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (item['title'], item['coverage'], item['missing'])
+                for item in res.data
+            ],
+            [('Омлет', 1.0, []), ('Блины', 0.6667, ['Мука'])],
+        )
+        self.assertEqual(res.data[1]['matched'], 2)
+        self.assertEqual(res.data[1]['total'], 3)
+
+    def test_index_reused(self):
+        """Тест — повторный подбор не перестраивает индекс."""
+        self.client.get(PANTRY_URL, {'ingredients': 'Мука'})
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                PANTRY_URL, {'ingredients': 'Огурец', 'limit': 1}
+            )
+
+        self.assertEqual([item['title'] for item in res.data], ['Салат'])
+
+    def test_ingredients_required(self):
+        """Тест — без ингредиентов возвращается ошибка."""
+        res = self.client.get(PANTRY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipe_save_keeps_index(self):
+        """Тест — изменение рецепта без ингредиентов не сбрасывает индекс."""
+        index = pantry.get_index()
+        recipe = Recipe.objects.get(title='Салат')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.title = 'Овощной салат'
+            recipe.save()
+
+        self.assertIs(pantry.get_index(), index)
+        self.assertIsNone(pantry._rebuild_thread)
+
+
+class RecipePantryRebuildTests(TransactionTestCase):
+    """Тесты фоновой перестройки индекса подбора рецептов."""
+
+    def setUp(self):
+        cache.clear()
+        pantry.clear()
+        ingredient_index.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user, title='Омлет')
+
+    def test_stale_index_served_while_rebuilding(self):
+        """Тест — после изменения ингредиентов индекс строится в фоне."""
+        index = pantry.get_index()
+        self.assertEqual(index.match(['Яйцо']), [])
+
+        res = self.client.patch(
+            detail_url(self.recipe.id),
+            {
+                'ingredients': [
+                    {'name': 'Яйцо', 'measurement_unit': 'шт', 'amount': 2}
+                ]
+            },
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertIs(pantry.get_index(), index)
+        thread = pantry._rebuild_thread
+        if thread is not None:
+            thread.join()
+        matches = pantry.get_index().match(['Яйцо'])
+        self.assertEqual(
+            [match['recipe_id'] for match in matches], [self.recipe.id]
+        )
+
+
+class RecipeBulkCreateTests(TestCase):
+    """Тесты пакетного создания рецептов."""
+
+    def setUp(self):
+        ingredient_index.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def _payload(self, count, offset=0):
+        return [
+            {
+                'title': f'Рецепт {i}',
+                'cooking_time': 10 + i,
+                'ingredients': [
+                    {
+                        'name': f'Ингредиент {i % 3}',
+                        'measurement_unit': 'г',
+                        'amount': i + 1,
+                    },
+                    {'name': 'Соль', 'measurement_unit': 'г', 'amount': 1},
+                ],
+                'tags': [{'name': f'Тег {i % 2}'}, {'name': 'Общий'}],
+            }
+            for i in range(offset, offset + count)
+        ]
+
+    def test_bulk_create_recipes(self):
+        """Тест — рецепты создаются со связями и возвращаются по порядку."""
+        payload = self._payload(4)
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data],
+            [item['title'] for item in payload],
+        )
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 4)
+        self.assertEqual(Tag.objects.filter(name='Общий').count(), 1)
+        self.assertEqual(Ingredient.objects.filter(name='Соль').count(), 1)
+        recipe = recipes.get(title='Рецепт 3')
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(
+            recipe.recipeingredient_set.get(ingredient__name='Ингредиент 0')
+            .amount,
+            4,
+        )
+        self.assertEqual(res.data[3], RecipeDetailSerializer(recipe).data)
+
+    def test_bulk_create_query_count_constant(self):
+        """Тест — число запросов не зависит от размера пакета."""
+        self.client.post(BULK_URL, self._payload(3), format='json')
+        ingredient_index.clear()
+        ingredient_index.get_index()
+
+        for offset, count in ((3, 2), (5, 30)):
+            with self.assertNumQueries(9):
+                res = self.client.post(
+                    BULK_URL, self._payload(count, offset), format='json'
+                )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(res.data), count)
+
+    def test_bulk_create_errors_per_item(self):
+        """Тест — при ошибке в одном рецепте ничего не создается."""
+        payload = self._payload(2)
+        payload[1]['cooking_time'] = 'долго'
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('cooking_time', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_requires_list(self):
+        """Тест — пустой список и объект вместо списка отклоняются."""
+        for payload in ([], self._payload(1)[0]):
+            res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeExportTests(TestCase):
+    """Тесты потоковой выгрузки рецептов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        for i in range(5):
+            recipe = create_recipe(user=self.user, title=f'Рецепт {i}')
+            recipe.tags.add(Tag.objects.create(name=f'Тег {i}'))
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=salt, amount=i + 1
+            )
+
+    def _content(self, res):
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Тест — выгрузка NDJSON в порядке id со связями."""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        items = [json.loads(line) for line in self._content(res).splitlines()]
+        self.assertEqual(
+            [item['title'] for item in items],
+            [f'Рецепт {i}' for i in range(5)],
+        )
+        self.assertEqual(items[1]['tags'], [{'name': 'Тег 1'}])
+        self.assertEqual(
+            items[1]['ingredients'],
+            [{'name': 'Соль', 'measurement_unit': 'г', 'amount': 2}],
+        )
+
+    def test_export_csv_filtered(self):
+        """Тест — выгрузка CSV учитывает фильтры списка."""
+        res = self.client.get(EXPORT_URL, {'output': 'csv', 'tags': 'Тег 3'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        lines = self._content(res).splitlines()
+        self.assertEqual(
+            lines[0],
+            'id,title,description,cooking_time,link,image,tags,ingredients',
+        )
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(
+            lines[1].endswith(
+                ',Рецепт 3,Описание рецепта,55,http://example.com,,'
+                'Тег 3,Соль|г|4'
+            )
+        )
+
+    def test_export_reads_in_chunks(self):
+        """Тест — связи подгружаются отдельными запросами на пачку."""
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            res = self.client.get(EXPORT_URL)
+            with self.assertNumQueries(7):
+                content = self._content(res)
+
+        self.assertEqual(len(content.splitlines()), 5)
+
+    def test_export_requires_auth(self):
+        """Тест — выгрузка доступна только после аутентификации."""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
 class ImageUploadTests(TestCase):
     """Тесты для URL загрузки изображений."""
 
@@ -509,9 +1514,23 @@ class ImageUploadTests(TestCase):
         )
         self.client.force_authenticate(self.user)
         self.recipe = create_recipe(user=self.user)
-
-    def tearDown(self):
-        self.recipe.image.delete()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def _upload(self, size=(10, 10), color='black', recipe=None):
+        """Загружает изображение заданного размера и цвета в рецепт."""
+        recipe = recipe or self.recipe
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', size, color).save(image_file, format='JPEG')
+            image_file.seek(0)
+            return self.client.post(
+                image_upload_url(recipe.id),
+                {'image': image_file},
+                format='multipart',
+            )
 
     def test_upload_image(self):
         """Тест загрузки изображения в рецепт."""
@@ -528,6 +1547,81 @@ class ImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def _run_worker(self):
+        """Выполняет задачи из очереди в текущем потоке."""
+        call_command('run_worker', burst=True, stdout=StringIO())
+
+    def test_upload_image_renditions(self):
+        """Тест создания уменьшенных копий изображения после загрузки."""
+        res = self._upload(size=(2000, 1000))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            Job.objects.get().task, images.generate_renditions.name
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_renditions, {})
+
+        self._run_worker()
+
+        self.assertFalse(Job.objects.exists())
+        self.recipe.refresh_from_db()
+        renditions = self.recipe.image_renditions
+        self.assertEqual(set(renditions), set(images.RENDITIONS))
+        storage = self.recipe.image.storage
+        for name, (width, height) in images.RENDITIONS.items():
+            self.assertEqual(set(renditions[name]), {'webp', 'jpeg'})
+            for path in renditions[name].values():
+                with storage.open(path) as f, Image.open(f) as rendition:
+                    self.assertLessEqual(rendition.width, width)
+                    self.assertLessEqual(rendition.height, height)
+                    self.assertEqual(
+                        rendition.width, min(width, height * 2, 2000)
+                    )
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(
+            res.data['image_renditions']['thumbnail']['webp'],
+            'http://testserver'
+            + storage.url(renditions['thumbnail']['webp']),
+        )
+
+    def test_upload_image_renditions_replaced(self):
+        """Тест, что копии замененного изображения не сохраняются."""
+        self._upload(color='red')
+        self._upload(color='blue')
+
+        self._run_worker()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            self.recipe.image_renditions,
+            images.rendition_paths(self.recipe.image.name),
+        )
+
+    def test_upload_identical_image_deduplicated(self):
+        """Тест, что одинаковые изображения хранятся одним файлом."""
+        other = create_recipe(user=self.user)
+
+        self._upload()
+        with patch(
+            'core.storage.ContentAddressedStorage._save',
+            side_effect=AssertionError('файл записан повторно'),
+        ):
+            res = self._upload(recipe=other)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        name = self.recipe.image.name
+        self.assertEqual(other.image.name, name)
+        self.assertRegex(
+            name, r'^uploads/recipe/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$'
+        )
+        self.assertEqual(ImageFile.objects.get(name=name).ref_count, 2)
+
+        self._upload(color='white')
+        self.assertEqual(ImageFile.objects.get(name=name).ref_count, 1)
+
     def test_upload_image_bad_request(self):
         """Тест загрузки некорректного изображения."""
         url = image_upload_url(self.recipe.id)
@@ -0,0 +1,165 @@
+"""
+Тест для API списка покупок.
+"""
+
+from core.models import Ingredient, Recipe, RecipeIngredient
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+SHOPPING_LIST_URL = reverse('recipe:shopping-list')
+
+
+def create_user(username='testUser', password='testpass1223'):
+    """Вспомогательная функция — создает и возвращает юзера."""
+    return get_user_model().objects.create_user(
+        username=username, password=password
+    )
+
+
+class PublicShoppingListApiTests(TestCase):
+    """Тест неаутентифицированных запросов."""
+
+    def test_auth_required(self):
+        """Тест — список покупок доступен только после аутентификации."""
+        res = APIClient().post(
+            SHOPPING_LIST_URL, {'recipes': [{'id': 1}]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateShoppingListApiTests(TestCase):
+    """Тест списка покупок для аутентифицированных пользователей."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        egg = Ingredient.objects.create(name='Яйцо', measurement_unit='шт')
+        milk = Ingredient.objects.create(name='Молоко', measurement_unit='мл')
+        milk_cups = Ingredient.objects.create(
+            name='Молоко', measurement_unit='стакан'
+        )
+        self.omelette = self._create_recipe('Омлет', ((egg, 3), (milk, 100)))
+        self.pancakes = self._create_recipe(
+            'Блины', ((egg, 2), (milk, 500), (milk_cups, 1))
+        )
+
+    def _create_recipe(self, title, ingredients):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, cooking_time=10
+        )
+        for ingredient, amount in ingredients:
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+        return recipe
+
+    def test_amounts_summed_in_one_query(self):
+        """Тест — количества суммируются с учетом порций одним запросом."""
+        payload = {
+            'recipes': [
+                {'id': self.omelette.id, 'servings': 2},
+                {'id': self.pancakes.id},
+            ]
+        }
+        with self.assertNumQueries(1):
+            res = self.client.post(SHOPPING_LIST_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            [
+                {'name': 'Молоко', 'measurement_unit': 'мл', 'amount': 700},
+                {'name': 'Молоко', 'measurement_unit': 'стакан', 'amount': 1},
+                {'name': 'Яйцо', 'measurement_unit': 'шт', 'amount': 8},
+            ],
+        )
+
+    def test_repeated_recipe_servings_added(self):
+        """Тест — порции повторяющегося рецепта складываются."""
+        payload = {
+            'recipes': [{'id': self.omelette.id}, {'id': self.omelette.id}]
+        }
+        res = self.client.post(SHOPPING_LIST_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        amounts = {item['name']: item['amount'] for item in res.data}
+        self.assertEqual(amounts, {'Молоко': 200, 'Яйцо': 6})
+
+    def test_download_csv(self):
+        """Тест — список покупок отдается файлом CSV."""
+        payload = {'recipes': [{'id': self.omelette.id}]}
+        res = self.client.post(
+            f'{SHOPPING_LIST_URL}?download=csv', payload, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('shopping-list.csv', res['Content-Disposition'])
+        content = b''.join(res.streaming_content).decode()
+        self.assertEqual(
+            content.splitlines(),
+            [
+                'Ингредиент,Единицы измерения,Количество',
+                'Молоко,мл,100',
+                'Яйцо,шт,3',
+            ],
+        )
+
+    def test_download_text(self):
+        """Тест — список покупок отдается текстовым файлом."""
+        payload = {'recipes': [{'id': self.omelette.id}]}
+        res = self.client.post(
+            f'{SHOPPING_LIST_URL}?download=txt', payload, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        content = b''.join(res.streaming_content).decode()
+        self.assertEqual(content, 'Молоко — 100 мл\nЯйцо — 3 шт\n')
+
+    def test_invalid_request(self):
+        """Тест — пустой список рецептов и неизвестный формат отклоняются."""
+        res = self.client.post(
+            SHOPPING_LIST_URL, {'recipes': []}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(
+            f'{SHOPPING_LIST_URL}?download=pdf',
+            {'recipes': [{'id': self.omelette.id}]},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_large_amounts_do_not_overflow(self):
+        """Тест — сумма больше integer считается без ошибки."""
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        recipe = self._create_recipe('Засолка', ((salt, 32767),))
+        payload = {
+            'recipes': [{'id': recipe.id, 'servings': 1000}] * 100
+        }
+        res = self.client.post(SHOPPING_LIST_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['amount'], 32767 * 1000 * 100)
+
+    def test_limits(self):
+        """Тест — число порций и рецептов в запросе ограничено."""
+        res = self.client.post(
+            SHOPPING_LIST_URL,
+            {'recipes': [{'id': self.omelette.id, 'servings': 1001}]},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(
+            SHOPPING_LIST_URL,
+            {'recipes': [{'id': self.omelette.id}] * 101},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -2,19 +2,60 @@
 Вью для API рецептов.
 """
 
-from core.models import Ingredient, Recipe, Tag
+from core.models import Ingredient, Recipe, RecipeIngredient, Tag
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, status, viewsets
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import (
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+
+from recipe import (
+    export,
+    fastpath,
+    filters,
+    images,
+    pagination,
+    pantry,
+    serializers,
+    shopping,
+    suggest,
+)
+from recipe.cache import cache_anonymous_response
+from recipe.conditional import (
+    conditional_recipe_response,
+    set_validators,
+)
 
-from recipe import filters, serializers
+
+def get_limit(request, default, maximum):
+    """Возвращает параметр limit запроса или None, если он неверный."""
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except ValueError:
+        return None
+    if not 1 <= limit <= maximum:
+        return None
+    return limit
+
+
+def invalid_limit_response(maximum):
+    """Ответ с ошибкой параметра limit."""
+    return Response(
+        {'limit': f'Укажите число от 1 до {maximum}.'},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -22,11 +63,122 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all().order_by('-id')
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticatedOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ('tags', 'ingredients')
     filterset_class = filters.RecipeFilter
+    pagination_class = pagination.RecipeCursorPagination
+    action_prefetches = {
+        'list': ('tags', 'ingredients_display'),
+        'retrieve': ('tags', 'ingredients_display'),
+        'create': ('tags', 'ingredients_display'),
+        'update': ('tags', 'ingredients_display'),
+        'partial_update': ('tags', 'ingredients_display'),
+        'bulk_create': ('tags', 'ingredients_display'),
+    }
+    bulk_max_size = 500
+    export_chunk_size = export.EXPORT_CHUNK_SIZE
+    export_outputs = {
+        'ndjson': ('application/x-ndjson', export.stream_ndjson),
+        'csv': ('text/csv; charset=utf-8', export.stream_csv),
+    }
+
+    sparse_fields_actions = ('list', 'retrieve')
+
+    def _get_list_param(self, name):
+        """Возвращает значения параметра запроса через запятую или None."""
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+    def get_sparse_fields(self):
+        """Возвращает параметры fields и expand для текущего запроса."""
+        if self.action not in self.sparse_fields_actions:
+            return {}
+        return {
+            'fields': self._get_list_param('fields'),
+            'expand': self._get_list_param('expand'),
+        }
+
+    def get_serializer(self, *args, **kwargs):
+        """Передает в сериализатор выбранные клиентом поля."""
+        kwargs.update(self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_prefetches(self):
+        """
+        Возвращает prefetch-выражения для текущего action,
+        пропуская связи, которые не попадут в ответ.
+        """
+        prefetches = {
+            'tags': Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            'ingredients_display': Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ).order_by('id'),
+            ),
+        }
+        fields = self.action_prefetches.get(self.action, ())
+        sparse_fields = self.get_sparse_fields()
+        if sparse_fields:
+            selected = self.get_serializer_class().select_fields(
+                **sparse_fields
+            )
+            fields = [field for field in fields if field in selected]
+        return [prefetches[field] for field in fields]
+
+    def get_queryset(self):
+        """
+        Подгружает связанные объекты одним запросом на связь,
+        чтобы число запросов не зависело от количества рецептов.
+        """
+        return super().get_queryset().prefetch_related(*self.get_prefetches())
+
+    @conditional_recipe_response
+    @cache_anonymous_response
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Получение рецепта. Поддерживает условные запросы, для анонимных
+        пользователей ответ кэшируется.
+        """
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        response = Response(serializer.data)
+        return set_validators(
+            response, request, instance.pk, instance.updated_at
+        )
+
+    @cache_anonymous_response
+    def list(self, request, *args, **kwargs):
+        """
+        Список рецептов. При включенном RECIPE_FAST_LIST строки собираются
+        из values() без полей сериализатора. Для анонимных пользователей
+        ответ кэшируется.
+        """
+        if not settings.RECIPE_FAST_LIST:
+            return super().list(request, *args, **kwargs)
+
+        fields = [
+            name
+            for name, field in self.get_serializer().fields.items()
+            if not field.write_only
+        ]
+        queryset = self.filter_queryset(self.queryset.all())
+        queryset = queryset.values(
+            *fastpath.RECIPE_COLUMNS, *queryset.query.annotations
+        )
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        data = fastpath.build_recipe_rows(rows, fields, request)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
     def destroy(self, request, *args, **kwargs):
         """Удаление рецепта доступно только его автору."""
@@ -50,22 +202,134 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def _reload_instance(self, serializer):
+        """
+        Перечитывает сохраненный рецепт с подгрузкой связей,
+        чтобы ответ сериализовался за фиксированное число запросов.
+        """
+        pk = serializer.instance.pk
+        serializer.instance = self.get_queryset().get(pk=pk)
+
     def perform_create(self, serializer):
         """Создание нового рецепта."""
         serializer.save(user=self.request.user)
+        self._reload_instance(serializer)
+
+    def perform_update(self, serializer):
+        """Обновление рецепта."""
+        serializer.save()
+        self._reload_instance(serializer)
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Загрузка изображения рецепта."""
+        """
+        Загрузка изображения рецепта. Уменьшенные копии создаются
+        фоновой задачей, которая ставится в очередь вместе с сохранением.
+        """
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save(image_renditions={})
+                images.schedule_renditions(recipe)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk_create(self, request):
+        """
+        Пакетное создание рецептов из списка. Рецепты проверяются
+        вместе: при ошибках ничего не создается, а ответ содержит
+        ошибки для каждого рецепта списка.
+        """
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=self.bulk_max_size,
+        )
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.save(user=request.user)
+
+        ids = [recipe.pk for recipe in recipes]
+        instances = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [instances[pk] for pk in ids], many=True
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='export',
+        permission_classes=(IsAuthenticated,),
+    )
+    def export(self, request):
+        """
+        Выгрузка всех рецептов с тегами и ингредиентами потоком:
+        ?output=ndjson (по умолчанию) или ?output=csv. Поддерживает
+        фильтры списка рецептов.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in self.export_outputs:
+            return Response(
+                {'output': 'Доступные форматы: ndjson, csv.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = self.filter_queryset(self.queryset.all()).order_by('id')
+        items = export.export_recipes(
+            queryset, request, self.export_chunk_size
+        )
+        content_type, stream = self.export_outputs[output]
+        response = StreamingHttpResponse(
+            stream(items), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{output}"'
+        )
+        return response
+
+    @action(methods=['GET'], detail=False, url_path='pantry')
+    def pantry(self, request):
+        """
+        Подбор рецептов по имеющимся ингредиентам:
+        ?ingredients=<названия через запятую>&limit=<N>.
+        Рецепты упорядочены по доле имеющихся ингредиентов, для каждого
+        перечислены недостающие.
+        """
+        names = self._get_list_param('ingredients')
+        if not names:
+            return Response(
+                {'ingredients': 'Укажите ингредиенты через запятую.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = get_limit(
+            request, pantry.PANTRY_LIMIT, pantry.MAX_PANTRY_LIMIT
+        )
+        if limit is None:
+            return invalid_limit_response(pantry.MAX_PANTRY_LIMIT)
+
+        matches = pantry.get_index().match(names, limit)
+        recipes = Recipe.objects.only('title', 'cooking_time').in_bulk(
+            [match['recipe_id'] for match in matches]
+        )
+        data = []
+        for match in matches:
+            recipe = recipes.get(match.pop('recipe_id'))
+            if recipe is not None:
+                data.append(
+                    {
+                        'id': recipe.id,
+                        'title': recipe.title,
+                        'cooking_time': recipe.cooking_time,
+                        **match,
+                    }
+                )
+        return Response(data)
+
 
 class BaseRecipeAttributesViewSet(
     mixins.DestroyModelMixin,
@@ -75,7 +339,10 @@ class BaseRecipeAttributesViewSet(
 ):
     """Базовый вьюсет для тегов и ингредиентов."""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
@@ -99,4 +366,72 @@ class IngredientViewSet(BaseRecipeAttributesViewSet):
 
     serializer_class = serializers.IngredientSerializer
     queryset = Ingredient.objects.all()
-    pagination_class = PageNumberPagination
+    pagination_class = pagination.EstimatedCountPagination
+
+    @action(methods=['GET'], detail=False, url_path='suggest')
+    def suggest(self, request):
+        """
+        Подсказки ингредиентов по части названия: ?q=<текст>&limit=<N>.
+        Возвращает до N самых похожих ингредиентов без пагинации.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'q': 'Укажите текст для поиска ингредиента.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = get_limit(
+            request, suggest.SUGGEST_LIMIT, suggest.MAX_SUGGEST_LIMIT
+        )
+        if limit is None:
+            return invalid_limit_response(suggest.MAX_SUGGEST_LIMIT)
+
+        ingredients = suggest.suggest_ingredients(query, limit)
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
+
+
+class ShoppingListView(APIView):
+    """
+    Список покупок для набора рецептов.
+
+    Принимает {"recipes": [{"id": 1, "servings": 2}, ...]} и возвращает
+    суммарное количество каждого ингредиента. С параметром
+    ?download=csv или ?download=txt список отдается файлом потоком.
+    """
+
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
+    permission_classes = (IsAuthenticated,)
+    downloads = {
+        'csv': ('text/csv', shopping.stream_csv),
+        'txt': ('text/plain', shopping.stream_text),
+    }
+
+    def post(self, request, *args, **kwargs):
+        serializer = serializers.ShoppingListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rows = shopping.shopping_list(serializer.get_servings())
+
+        download = request.query_params.get('download')
+        if download is None:
+            return Response(
+                serializers.ShoppingListItemSerializer(rows, many=True).data
+            )
+        if download not in self.downloads:
+            return Response(
+                {'download': 'Доступные форматы: csv, txt.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        content_type, stream = self.downloads[download]
+        response = StreamingHttpResponse(
+            stream(rows.iterator()),
+            content_type=f'{content_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping-list.{download}"'
+        )
+        return response
@@ -0,0 +1,176 @@
+"""
+Аутентификация по токену с кэшированием в памяти процесса.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+
+from user import tokens
+
+
+class TokenCache:
+    """
+    Ограниченный LRU-кэш токен -> (юзер, токен) с временем жизни записей.
+
+    Кэш живет в памяти процесса, поэтому изменения, сделанные в другом
+    процессе, становятся видны не позже чем через ttl секунд.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Возвращает (юзер, токен) или None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, user, token = entry
+            if expires <= time.monotonic():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+        return copy.copy(user), token
+
+    def set(self, key, user, token):
+        """Сохраняет результат проверки токена."""
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, user, token)
+            self._user_keys.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate_key(self, key):
+        """Удаляет запись токена."""
+        with self._lock:
+            self._pop(key)
+
+    def invalidate_user(self, user_id):
+        """Удаляет все записи юзера."""
+        with self._lock:
+            for key in list(self._user_keys.get(user_id, ())):
+                self._pop(key)
+
+    def clear(self):
+        """Очищает кэш."""
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[1].pk
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, которая хранит результат проверки токена
+    в token_cache и не обращается к БД для повторных запросов.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token)
+        return copy.copy(user), token
+
+
+def _load_active_user(user_id):
+    """Загружает активного юзера или отклоняет аутентификацию."""
+    try:
+        return get_user_model().objects.get(pk=user_id, is_active=True)
+    except get_user_model().DoesNotExist:
+        raise exceptions.AuthenticationFailed(
+            _('Пользователь неактивен или удален.')
+        )
+
+
+class TokenUser(SimpleLazyObject):
+    """
+    Юзер из подписанного токена. id и признак аутентификации доступны
+    без запроса к БД, остальные атрибуты загружают юзера при обращении.
+    Если юзер удален или деактивирован, загрузка поднимает
+    AuthenticationFailed, и вью отвечает 401.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id):
+        super().__init__(lambda: _load_active_user(user_id))
+        self.__dict__['_user_id'] = user_id
+
+    @property
+    def pk(self):
+        return self.__dict__['_user_id']
+
+    id = pk
+
+    def __bool__(self):
+        return True
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Аутентификация по подписанному токену доступа из user.tokens.
+
+    Заголовок: "Authorization: Bearer <токен>". Проверка подписи и срока
+    действия не обращается к БД.
+    """
+
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(
+                _('Некорректный заголовок токена.')
+            )
+
+        try:
+            token = auth[1].decode()
+            user_id, _version = tokens.verify_access_token(token)
+        except (UnicodeError, tokens.InvalidToken):
+            raise exceptions.AuthenticationFailed(
+                _('Токен недействителен или истек.')
+            )
+        return TokenUser(user_id), token
+
+    def authenticate_header(self, request):
+        return self.keyword
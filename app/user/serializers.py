@@ -6,6 +6,8 @@ from django.contrib.auth import authenticate, get_user_model
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
+from user import tokens
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для объекта юзера."""
@@ -52,3 +54,26 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Сериализатор для обновления токена доступа."""
+
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        """Проверка токена обновления и версии ключа юзера."""
+        message = _('Токен обновления недействителен или отозван.')
+        try:
+            user_id, version = tokens.verify_refresh_token(attrs['refresh'])
+        except tokens.InvalidToken:
+            raise serializers.ValidationError(message, code='authorization')
+
+        user = get_user_model().objects.filter(
+            pk=user_id, is_active=True, token_version=version
+        ).first()
+        if user is None:
+            raise serializers.ValidationError(message, code='authorization')
+
+        attrs['user'] = user
+        return attrs
@@ -0,0 +1,23 @@
+"""
+Сигналы для инвалидации кэша токенов.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Удаляет удаленный токен из кэша."""
+    token_cache.invalidate_key(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    """Удаляет из кэша токены измененного или удаленного юзера."""
+    token_cache.invalidate_user(instance.pk)
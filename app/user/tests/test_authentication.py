@@ -0,0 +1,282 @@
+"""
+Тесты аутентификации по токену с кэшированием.
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import TokenCache, token_cache
+from user.tokens import issue_access_token
+
+ME_URL = reverse('user:me')
+ACCESS_URL = reverse('user:token-access')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Тесты CachedTokenAuthentication."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='testUser', password='testpass123', name='Test'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        """Тест — повторный запрос не обращается к БД за токеном."""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['username'], self.user.username)
+
+    def test_deleted_token_invalidated(self):
+        """Тест — удаленный токен перестает работать сразу."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        """Тест — деактивированный юзер теряет доступ сразу."""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_invalidated(self):
+        """Тест — после изменения юзера возвращаются новые данные."""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'New name'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New name')
+
+    def test_invalid_token_not_cached(self):
+        """Тест — неверный токен не попадает в кэш."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(token_cache), 0)
+
+
+class TokenCacheTests(TestCase):
+    """Тесты TokenCache."""
+
+    def setUp(self):
+        self.users = [
+            get_user_model().objects.create_user(username=f'user{i}')
+            for i in range(3)
+        ]
+
+    def test_lru_eviction(self):
+        """Тест — при переполнении удаляется давно не использованный."""
+        cache = TokenCache(maxsize=2, ttl=60)
+        cache.set('a', self.users[0], None)
+        cache.set('b', self.users[1], None)
+        cache.get('a')
+        cache.set('c', self.users[2], None)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+    @patch('user.authentication.time.monotonic')
+    def test_ttl_expiry(self, patched_monotonic):
+        """Тест — запись истекает через ttl секунд."""
+        patched_monotonic.return_value = 100
+        cache = TokenCache(maxsize=2, ttl=60)
+        cache.set('a', self.users[0], None)
+
+        patched_monotonic.return_value = 159
+        self.assertIsNotNone(cache.get('a'))
+        patched_monotonic.return_value = 160
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate_user(self):
+        """Тест — удаляются все токены юзера."""
+        cache = TokenCache(maxsize=10, ttl=60)
+        cache.set('a', self.users[0], None)
+        cache.set('b', self.users[0], None)
+        cache.set('c', self.users[1], None)
+
+        cache.invalidate_user(self.users[0].pk)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+class SignedTokenTests(TestCase):
+    """Тесты подписанных токенов доступа и обновления."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='testUser', password='testpass123', name='Test'
+        )
+        self.client = APIClient()
+        res = self.client.post(
+            ACCESS_URL, {'username': 'testUser', 'password': 'testpass123'}
+        )
+        self.access = res.data['access']
+        self.refresh = res.data['refresh']
+
+    def _bearer(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_issue_tokens_bad_credentials(self):
+        """Тест — токены не выдаются при неверном пароле."""
+        res = self.client.post(
+            ACCESS_URL, {'username': 'testUser', 'password': 'wrong'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('access', res.data)
+
+    def test_access_token_without_db(self):
+        """Тест — проверка токена доступа не обращается к БД."""
+        self._bearer(self.access)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_access_token_loads_user(self):
+        """Тест — юзер загружается, когда он нужен вью."""
+        self._bearer(self.access)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['username'], self.user.username)
+
+    def test_access_token_deleted_user(self):
+        """Тест — токен удаленного юзера отклоняется, а не дает 500."""
+        self._bearer(self.access)
+        self.user.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_access_token_inactive_user(self):
+        """Тест — токен деактивированного юзера отклоняется."""
+        self._bearer(self.access)
+        self.user.is_active = False
+        self.user.save()
+
+        payload = {
+            'title': 'Омлет',
+            'cooking_time': 10,
+            'ingredients': [],
+            'tags': [],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(self.user.recipe_set.exists())
+
+    def test_create_recipe_with_access_token(self):
+        """Тест — рецепт создается от имени юзера из токена."""
+        self._bearer(self.access)
+        payload = {
+            'title': 'Омлет',
+            'cooking_time': 10,
+            'ingredients': [],
+            'tags': [],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(self.user.recipe_set.filter(title='Омлет').exists())
+
+    def test_tampered_token_rejected(self):
+        """Тест — измененный токен отклоняется."""
+        user_id, rest = self.access.split('.', 1)
+        self._bearer(f'{int(user_id) + 1}.{rest}')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_not_accepted_as_access(self):
+        """Тест — токен обновления нельзя использовать для доступа."""
+        self._bearer(self.refresh)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @patch('user.tokens.time.time')
+    def test_expired_access_token_rejected(self, patched_time):
+        """Тест — истекший токен доступа отклоняется."""
+        patched_time.return_value = 1_000_000
+        token = issue_access_token(self.user)
+        self._bearer(token)
+        patched_time.return_value = 1_000_000 + 299
+        self.assertEqual(
+            self.client.get(TAGS_URL).status_code, status.HTTP_200_OK
+        )
+        patched_time.return_value = 1_000_000 + 300
+        self.assertEqual(
+            self.client.get(TAGS_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_refresh_issues_access_token(self):
+        """Тест — по токену обновления выдается новый токен доступа."""
+        res = self.client.post(REFRESH_URL, {'refresh': self.refresh})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self._bearer(res.data['access'])
+        self.assertEqual(
+            self.client.get(TAGS_URL).status_code, status.HTTP_200_OK
+        )
+
+    def test_revoke_invalidates_refresh_token(self):
+        """Тест — отзыв увеличивает версию ключа и отзывает токены."""
+        self._bearer(self.access)
+
+        res = self.client.post(REVOKE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_version, 1)
+        res = self.client.post(REFRESH_URL, {'refresh': self.refresh})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_inactive_user(self):
+        """Тест — деактивированный юзер не может обновить токен."""
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.post(REFRESH_URL, {'refresh': self.refresh})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
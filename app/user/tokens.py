@@ -0,0 +1,67 @@
+"""
+Подписанные токены доступа и обновления.
+
+Токен — строка "<id юзера>.<версия ключа>.<истекает>:<подпись>", где
+подпись — HMAC-SHA256 от SECRET_KEY. Токен доступа проверяется без
+обращения к БД. Токен обновления дополнительно сверяется с версией
+ключа юзера, поэтому увеличение версии отзывает все выданные токены
+обновления, а токены доступа перестают действовать по истечении срока.
+"""
+
+import time
+
+from django.conf import settings
+from django.core import signing
+
+ACCESS_SALT = 'user.tokens.access'
+REFRESH_SALT = 'user.tokens.refresh'
+
+
+class InvalidToken(Exception):
+    """Токен поврежден, подписан другим ключом или истек."""
+
+
+class TokenSigner(signing.Signer):
+    """Signer, который не принимает подписи устаревшим алгоритмом SHA1."""
+
+    legacy_algorithm = None
+
+    def __init__(self, salt):
+        super().__init__(salt=salt, algorithm='sha256')
+
+
+def _issue(user, salt, lifetime):
+    expires = int(time.time()) + lifetime
+    value = f'{user.pk}.{user.token_version}.{expires}'
+    return TokenSigner(salt).sign(value)
+
+
+def _verify(token, salt):
+    try:
+        value = TokenSigner(salt).unsign(token)
+        user_id, version, expires = (int(part) for part in value.split('.'))
+    except (signing.BadSignature, ValueError):
+        raise InvalidToken
+    if expires <= time.time():
+        raise InvalidToken
+    return user_id, version
+
+
+def issue_access_token(user):
+    """Выдает токен доступа юзеру."""
+    return _issue(user, ACCESS_SALT, settings.ACCESS_TOKEN_LIFETIME)
+
+
+def issue_refresh_token(user):
+    """Выдает токен обновления юзеру."""
+    return _issue(user, REFRESH_SALT, settings.REFRESH_TOKEN_LIFETIME)
+
+
+def verify_access_token(token):
+    """Проверяет токен доступа, возвращает (id юзера, версия ключа)."""
+    return _verify(token, ACCESS_SALT)
+
+
+def verify_refresh_token(token):
+    """Проверяет подпись и срок токена обновления."""
+    return _verify(token, REFRESH_SALT)
@@ -2,11 +2,25 @@
 Вью для API юзера.
 """
 
-from rest_framework import authentication, generics, permissions
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
-from user.serializers import AuthTokenSerializer, UserSerializer
+from user import tokens
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+from user.serializers import (
+    AuthTokenSerializer,
+    RefreshTokenSerializer,
+    UserSerializer,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -22,11 +36,70 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
+class CreateSignedTokenView(generics.GenericAPIView):
+    """Вью для выдачи подписанных токенов доступа и обновления."""
+
+    serializer_class = AuthTokenSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        return Response(
+            {
+                'access': tokens.issue_access_token(user),
+                'refresh': tokens.issue_refresh_token(user),
+                'token_type': SignedTokenAuthentication.keyword,
+                'expires_in': settings.ACCESS_TOKEN_LIFETIME,
+            }
+        )
+
+
+class RefreshSignedTokenView(generics.GenericAPIView):
+    """Вью для выдачи нового токена доступа по токену обновления."""
+
+    serializer_class = RefreshTokenSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        return Response(
+            {
+                'access': tokens.issue_access_token(user),
+                'token_type': SignedTokenAuthentication.keyword,
+                'expires_in': settings.ACCESS_TOKEN_LIFETIME,
+            }
+        )
+
+
+class RevokeSignedTokensView(APIView):
+    """
+    Вью для отзыва подписанных токенов юзера. Увеличивает версию ключа,
+    после чего выданные токены обновления перестают действовать.
+    """
+
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        get_user_model().objects.filter(pk=request.user.pk).update(
+            token_version=F('token_version') + 1
+        )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Вью для обновления данных пользователя."""
 
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
@@ -5,5 +5,6 @@ set -e
 python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
+python manage.py createcachetable
 
 gunicorn --bind 0.0.0.0:9000 app.wsgi
\ No newline at end of file